@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for the scraper, the API searcher, the scheduler tick and the
+main routes. Run with `python -m benchmarks.run --help`; see run.py.
+"""
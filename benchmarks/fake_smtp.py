@@ -0,0 +1,83 @@
+"""
+Minimal SMTP sink for benchmarks: accepts every message and only counts it.
+
+Speaks just enough of RFC 5321 for `smtplib.SMTP.sendmail` without STARTTLS or
+AUTH (run the app with SMTP_STARTTLS=0 and no EMAIL_PASSWORD).
+
+Usage:
+    with FakeSMTPServer() as smtp:
+        os.environ['SMTP_HOST'], os.environ['SMTP_PORT'] = smtp.host, str(smtp.port)
+        ...
+        print(smtp.messages)
+"""
+import socketserver
+import threading
+
+
+class FakeSMTPServer:
+    def __init__(self, host='127.0.0.1', port=0):
+        self.messages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='fake-smtp', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _received(self, size):
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+
+    def _handler_class(self):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode('ascii') + b'\r\n')
+
+            def handle(self):
+                self.reply('220 localhost fake SMTP ready')
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode('utf-8', 'replace').strip().upper()
+                    if command.startswith(('EHLO', 'HELO')):
+                        self.reply('250 localhost')
+                    elif command == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        size = 0
+                        for data_line in self.rfile:
+                            if data_line in (b'.\r\n', b'.\n'):
+                                break
+                            size += len(data_line)
+                        sink._received(size)
+                        self.reply('250 OK: queued')
+                    elif command == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('250 OK')
+
+        return Handler
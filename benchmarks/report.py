@@ -0,0 +1,84 @@
+"""
+Latency samples and the percentile/throughput report printed by the benchmark runner.
+
+Usage:
+    recorder = Recorder()
+    with recorder.measure('api.search_products'):
+        search_products(...)
+    recorder.print_report()
+    recorder.write_json('results.json')
+"""
+import json
+import math
+import time
+from contextlib import contextmanager
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}  # name -> [seconds, ...]
+        self.units = {}  # name -> work units per sample (e.g. searches per tick)
+        self.extra = {}  # name -> {counter: value}
+
+    @contextmanager
+    def measure(self, name, units=1):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started, units)
+
+    def add(self, name, seconds, units=1):
+        self.samples.setdefault(name, []).append(seconds)
+        self.units[name] = self.units.get(name, 0) + units
+
+    def note(self, name, **counters):
+        self.extra.setdefault(name, {}).update(counters)
+
+    def summary(self):
+        result = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            total = sum(ordered)
+            stats = {
+                'count': len(ordered),
+                'mean_ms': total / len(ordered) * 1000,
+                'min_ms': ordered[0] * 1000,
+                'max_ms': ordered[-1] * 1000,
+                'throughput_per_s': self.units[name] / total if total else None,
+            }
+            for pct in PERCENTILES:
+                stats[f'p{pct}_ms'] = percentile(ordered, pct) * 1000
+            stats.update(self.extra.get(name, {}))
+            result[name] = stats
+        return result
+
+    def print_report(self):
+        header = f"{'benchmark':<34}{'n':>6}" + ''.join(f"{'p' + str(p):>10}" for p in PERCENTILES)
+        header += f"{'max':>10}{'ops/s':>11}"
+        print(header)
+        print('-' * len(header))
+        for name, stats in self.summary().items():
+            line = f"{name:<34}{stats['count']:>6}"
+            line += ''.join(f"{stats[f'p{p}_ms']:>8.1f}ms" for p in PERCENTILES)
+            line += f"{stats['max_ms']:>8.1f}ms"
+            throughput = stats['throughput_per_s']
+            line += f"{throughput:>11.1f}" if throughput is not None else f"{'-':>11}"
+            print(line)
+            extra = self.extra.get(name)
+            if extra:
+                print(' ' * 4 + ', '.join(f"{key}={value}" for key, value in extra.items()))
+
+    def write_json(self, path, meta=None):
+        with open(path, 'w', encoding='utf-8') as out:
+            json.dump({'meta': meta or {}, 'results': self.summary()}, out, indent=2, default=str)
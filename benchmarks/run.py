@@ -0,0 +1,124 @@
+"""
+Offline benchmark runner: starts the stubs, points the app at them, seeds data and
+reports latency percentiles and throughput per scenario.
+
+Nothing leaves 127.0.0.1: meinprospekt, the EDEKA API and Nominatim are served by
+stub_server.py, mail goes to fake_smtp.py, and the database is a fresh SQLite file
+(or --database-url). These are measurements for regression tracking, not tests.
+
+Usage:
+    python -m benchmarks.run
+    python -m benchmarks.run --saved-searches 10000 --results 1000000 --json bench.json
+    python -m benchmarks.run --scenarios scraper --backend browser --page-profile full
+"""
+import argparse
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+from benchmarks.stub_server import StubServer
+from benchmarks.fake_smtp import FakeSMTPServer
+from benchmarks.report import Recorder
+
+SCENARIOS = ('scraper', 'api', 'scheduler', 'routes')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--iterations', type=int, default=20, help='samples per scenario')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--saved-searches', type=int, default=1000)
+    parser.add_argument('--results', type=int, default=100_000, help='stored deals (ScraperResult rows)')
+    parser.add_argument('--own-results', type=int, default=50_000,
+                        help='deals owned by the user the route benchmarks log in as')
+    parser.add_argument('--products-per-batch', type=int, default=5)
+    parser.add_argument('--searches-per-product', type=int, default=10)
+    parser.add_argument('--offers-per-page', type=int, default=24)
+    parser.add_argument('--stub-latency', type=float, default=0.0, help='seconds added to every stub response')
+    parser.add_argument('--backend', default='http', choices=('auto', 'http', 'browser'),
+                        help='SCRAPER_BACKEND for the run (browser needs Playwright and Chromium)')
+    parser.add_argument('--page-profile', default='lean', help='SCRAPER_PAGE_PROFILE for browser scraping')
+    parser.add_argument('--export-iterations', type=int, default=1)
+    parser.add_argument('--drain-timeout', type=float, default=600, help='seconds to wait for scheduled searches')
+    parser.add_argument('--database-url', help='defaults to a new SQLite file in a temporary directory')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this file')
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, stub, smtp, workdir):
+    # Module-level settings are read at import time, so this runs before importing `website`
+    os.environ.update({
+        'DATABASE_URL': args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'MEINPROSPEKT_URL': stub.url('/webapp/'),
+        'EDEKA_API_URL': stub.url('/api/offers'),
+        'NOMINATIM_DOMAIN': f"{stub.host}:{stub.port}",
+        'NOMINATIM_SCHEME': 'http',
+        'SMTP_HOST': smtp.host,
+        'SMTP_PORT': str(smtp.port),
+        'SMTP_STARTTLS': '0',
+        'EMAIL_ADDRESS': 'alerts@example.com',
+        'EMAIL_PASSWORD': '',
+        'RECIPIENT_EMAIL': 'bench@example.com',
+        'SCRAPER_BACKEND': args.backend,
+        'SCRAPER_PAGE_PROFILE': args.page_profile,
+        'SCRAPER_ALLOWED_DOMAINS': stub.host,
+        'METRICS_RUN_LOG': '0',  # one JSON line per run would drown the report
+    })
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    recorder = Recorder()
+    with tempfile.TemporaryDirectory(prefix='findmyprize-bench-') as workdir, \
+            StubServer(args.offers_per_page, args.stub_latency) as stub, \
+            FakeSMTPServer() as smtp:
+        configure_environment(args, stub, smtp, workdir)
+
+        from website import create_app, scheduler
+        from benchmarks import scenarios as bench
+        from benchmarks.seed import seed
+
+        app = create_app()
+        scheduler.pause()  # the benchmark drives the tick itself
+
+        with app.app_context():
+            rows = args.users + args.saved_searches + args.results
+            with recorder.measure('seed.rows', units=rows):
+                user_id = seed(args.users, args.saved_searches, args.results, args.own_results)
+            print(f"Seeded {args.users} users, {args.saved_searches} saved searches, {args.results} deals")
+
+            if 'scraper' in scenarios:
+                bench.bench_scraper(recorder, args.iterations, args.products_per_batch, args.searches_per_product)
+            if 'api' in scenarios:
+                bench.bench_api(recorder, args.iterations)
+            if 'scheduler' in scenarios:
+                bench.bench_scheduler(recorder, max(args.iterations // 10, 1), args.drain_timeout)
+            if 'routes' in scenarios:
+                bench.bench_routes(app, recorder, args.iterations, user_id, args.export_iterations)
+
+        scheduler.shutdown(wait=False)
+        print()
+        recorder.print_report()
+        print(f"\nStub requests: {stub.requests}; emails sent: {smtp.messages}")
+
+        if args.json_path:
+            recorder.write_json(args.json_path, meta={
+                'started': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'args': vars(args),
+                'stub_requests': stub.requests,
+                'emails': smtp.messages,
+            })
+            print(f"Wrote {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
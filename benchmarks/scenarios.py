@@ -0,0 +1,110 @@
+"""
+Benchmark scenarios; each drives one part of the app against the local stubs.
+
+    scraper:   run_scraper_batch with the shared scrape cache cleared (cold) and warm
+    api:       search_products with the retailer cache cleared
+    scheduler: the minute tick over all due saved searches, then the time until the
+               search workers have drained everything it enqueued
+    routes:    key Flask routes for a user with many stored deals, via the test client
+
+Every scenario runs inside an app context and records into a `report.Recorder`.
+"""
+import time
+from datetime import datetime
+from website.models import SavedSearch, ScraperResult
+from website import db
+from benchmarks.seed import PRODUCTS, CITIES, COUNTRY, make_all_searches_due
+
+
+def bench_scraper(recorder, iterations, products_per_batch, searches_per_product):
+    from website.scrapper import run_scraper_batch, BatchSearch
+    from website.offer_cache import scrape_cache
+
+    searches = [
+        BatchSearch(product, 3.0)
+        for product in PRODUCTS[:products_per_batch]
+        for _ in range(searches_per_product)
+    ]
+    for i in range(iterations):
+        city = CITIES[i % len(CITIES)]
+        scrape_cache.clear()
+        with recorder.measure('scraper.batch_cold', units=len(searches)):
+            run_scraper_batch(city, COUNTRY, searches)
+        with recorder.measure('scraper.batch_shared_window', units=len(searches)):
+            run_scraper_batch(city, COUNTRY, searches)
+
+
+def bench_api(recorder, iterations):
+    from website.api_searcher import search_products
+    from website.offer_cache import retailer_cache
+
+    for i in range(iterations):
+        retailer_cache.clear()
+        product = PRODUCTS[i % len(PRODUCTS)]
+        with recorder.measure('api.search_products'):
+            search_products(CITIES[i % len(CITIES)], COUNTRY, product, 3.0, False)
+
+
+def _wait_until_idle(executor, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = executor.snapshot()
+        if stats['queued'] == 0 and stats['running'] == 0:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def bench_scheduler(recorder, iterations, drain_timeout):
+    from website.search_scheduler import check_scheduled_searches
+    from website.job_queue import search_executor
+    from website.offer_cache import scrape_cache
+
+    for _ in range(iterations):
+        make_all_searches_due()
+        scrape_cache.clear()
+        due = SavedSearch.query.filter(SavedSearch.next_run_at <= datetime.now()).count()
+        started = time.perf_counter()
+        with recorder.measure('scheduler.tick'):
+            check_scheduled_searches()
+        if not _wait_until_idle(search_executor, drain_timeout):
+            print(f"Search workers still busy after {drain_timeout}s; stopping the scheduler benchmark")
+            break
+        recorder.add('scheduler.due_searches_end_to_end', time.perf_counter() - started, units=due)
+    recorder.note('scheduler.tick', **{
+        key: value for key, value in search_executor.snapshot().items()
+        if key in ('submitted', 'coalesced', 'rejected', 'completed', 'failed', 'timed_out')
+    })
+
+
+def bench_routes(app, recorder, iterations, user_id, export_iterations):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    newest_id = db.session.query(db.func.max(ScraperResult.id)).filter_by(user_id=user_id).scalar() or 0
+    routes = {
+        'routes.home': '/',
+        'routes.deals_first_page': '/deals',
+        'routes.deals_deep_page': f'/deals?before={newest_id // 2}',
+        'routes.get_deals_poll': f'/get-deals?since={newest_id}',
+        'routes.price_history': '/price-history?product=butter&days=30',
+    }
+    for _ in range(iterations):
+        for name, url in routes.items():
+            with recorder.measure(name):
+                response = client.get(url)
+            if response.status_code >= 400:
+                print(f"{url} answered {response.status_code}")
+
+    exports = {
+        'routes.export_csv': '/export-deals?format=csv',
+        'routes.export_jsonl_gzip': '/export-deals?format=jsonl&gzip=1',
+    }
+    for name, url in exports.items():
+        size = 0
+        for _ in range(export_iterations):
+            with recorder.measure(name):
+                size = len(client.get(url).get_data())
+        recorder.note(name, bytes=size)
@@ -0,0 +1,114 @@
+"""
+Bulk data for benchmarks: users, scheduled saved searches and stored deals.
+
+Rows are written with executemany-style core inserts in batches, so seeding a
+million ScraperResult rows takes seconds rather than the ORM's minutes. The first
+user (`bench@example.com`) owns `own_results` of the deals; the route benchmarks
+log in as that user.
+
+Usage:
+    with app.app_context():
+        bench_user_id = seed(users=100, saved_searches=10_000, results=1_000_000)
+"""
+import random
+from datetime import datetime, timedelta
+from website import db
+from website.models import User, SavedSearch, ScraperResult
+
+PRODUCTS = [
+    'Butter', 'Milch', 'Kaffee', 'Eier', 'Käse', 'Joghurt', 'Brot', 'Nudeln', 'Reis', 'Olivenöl',
+    'Bananen', 'Äpfel', 'Tomaten', 'Hähnchen', 'Lachs', 'Schokolade', 'Mineralwasser', 'Bier', 'Wein', 'Müsli',
+]
+CITIES = ['Berlin', 'Hamburg', 'München', 'Köln', 'Frankfurt', 'Stuttgart', 'Düsseldorf', 'Leipzig']
+STORES = ['EDEKA', 'REWE', 'Lidl', 'ALDI SÜD', 'Kaufland', 'Netto Marken-Discount', 'PENNY', 'Globus']
+COUNTRY = 'Germany'
+BATCH_SIZE = 10_000
+
+
+def _insert(table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+    db.session.commit()
+
+
+def seed_users(count):
+    rows = [
+        {
+            'email': 'bench@example.com' if i == 0 else f'bench{i}@example.com',
+            'password': 'unused',
+            'first_name': f'Bench {i}',
+            'city': CITIES[i % len(CITIES)],
+            'country': COUNTRY,
+        }
+        for i in range(count)
+    ]
+    _insert(User.__table__, rows)
+    return [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+
+
+def seed_saved_searches(user_ids, count, products=PRODUCTS, cities=CITIES, email_share=0.1, rng=random):
+    """Scheduled ('manual', every 30 minutes) searches, all due now."""
+    now = datetime.now()
+    rows = [
+        {
+            'user_id': user_ids[i % len(user_ids)],
+            'product': products[i % len(products)],
+            'target_price': round(rng.uniform(0.5, 4.0), 2),
+            'city': cities[(i // len(products)) % len(cities)],
+            'country': COUNTRY,
+            'email_notification': rng.random() < email_share,
+            'date_created': now - timedelta(days=1),
+            'schedule_type': 'manual',
+            'interval_value': 30,
+            'interval_unit': 'minutes',
+            'next_run_at': now - timedelta(minutes=1),
+        }
+        for i in range(count)
+    ]
+    _insert(SavedSearch.__table__, rows)
+
+
+def make_all_searches_due():
+    SavedSearch.query.filter(SavedSearch.schedule_type.isnot(None)).update(
+        {SavedSearch.next_run_at: datetime.now() - timedelta(minutes=1)}, synchronize_session=False
+    )
+    db.session.commit()
+
+
+def seed_results(user_ids, count, own_results, days=90, rng=random):
+    """`own_results` deals for the first user, the rest spread over the others."""
+    now = datetime.now()
+    rows = []
+    for i in range(count):
+        user_id = user_ids[0] if i < own_results or len(user_ids) == 1 else user_ids[1 + i % (len(user_ids) - 1)]
+        product = PRODUCTS[i % len(PRODUCTS)]
+        store = STORES[i % len(STORES)]
+        price = round(rng.uniform(0.5, 4.0), 2)
+        created = now - timedelta(seconds=rng.uniform(0, days * 86400))
+        rows.append({
+            'data': f"Deal alert! {store} offers {product} for {price:.2f} €!",
+            'date_created': created,
+            'timestamp': created,
+            'store': store,
+            'price': price,
+            'user_id': user_id,
+            'product': product,
+            'target_price': round(price + 0.5, 2),
+            'city': CITIES[i % len(CITIES)],
+            'country': COUNTRY,
+            'email_notification': False,
+        })
+        if len(rows) >= BATCH_SIZE:
+            _insert(ScraperResult.__table__, rows)
+            rows = []
+    if rows:
+        _insert(ScraperResult.__table__, rows)
+
+
+def seed(users, saved_searches, results, own_results, seed_value=1):
+    """Fill an empty database; returns the id of the user the route benchmarks log in as."""
+    rng = random.Random(seed_value)
+    user_ids = seed_users(users)
+    seed_saved_searches(user_ids, saved_searches, rng=rng)
+    seed_results(user_ids, results, min(own_results, results), rng=rng)
+    return user_ids[0]
@@ -0,0 +1,165 @@
+"""
+Local stand-in for meinprospekt.de, the EDEKA offers API and Nominatim.
+
+Serves the recorded fixtures in benchmarks/fixtures/ with the search query filled
+in, so the app's real HTTP, browser and geocoding code paths run unchanged against
+127.0.0.1. Routes:
+
+    /webapp/?query=..     meinprospekt search page: offer cards plus embedded JSON
+    /api/offers?query=..  EDEKA offers API
+    /search?q=..          Nominatim search (coordinates derived from the query)
+    /static/...           page assets, so blocked vs. allowed requests are visible
+
+`offers_per_page` repeats the recorded offers to the wanted page size and
+`latency` (seconds) delays every response to emulate the network.
+
+Usage:
+    with StubServer(offers_per_page=40, latency=0.05) as stub:
+        os.environ['MEINPROSPEKT_URL'] = stub.url('/webapp/')
+"""
+import hashlib
+import html
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+def _fixture(name):
+    return (FIXTURES / name).read_text(encoding='utf-8')
+
+
+def _coordinates(query):
+    # Stable, distinct coordinates per place inside Germany
+    digest = hashlib.sha1(query.lower().encode('utf-8')).digest()
+    return 47.5 + digest[0] / 255 * 7, 6.0 + digest[1] / 255 * 9
+
+
+class StubServer:
+    def __init__(self, offers_per_page=24, latency=0.0, host='127.0.0.1', port=0):
+        self.offers_per_page = offers_per_page
+        self.latency = latency
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._page = _fixture('meinprospekt_search.html')
+        self._card = _fixture('meinprospekt_card.html')
+        self._offers = json.loads(_fixture('meinprospekt_offers.json'))
+        self._edeka = _fixture('edeka_offers.json')
+        self._nominatim = _fixture('nominatim_search.json')
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def url(self, path='/'):
+        return f"http://{self.host}:{self.port}{path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, route):
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+    def search_page(self, query):
+        offers = [
+            dict(offer, title=offer['title'].replace('{{query}}', query))
+            for offer in (self._offers[i % len(self._offers)] for i in range(self.offers_per_page))
+        ]
+        cards = ''.join(
+            self._card
+            .replace('{{index}}', str(index))
+            .replace('{{store}}', html.escape(offer['store']))
+            .replace('{{title}}', html.escape(offer['title']))
+            .replace('{{price}}', f"{offer['price']:.2f} €".replace('.', ','))
+            for index, offer in enumerate(offers)
+        )
+        payload = json.dumps({'props': {'pageProps': {'offers': [
+            {
+                'title': offer['title'],
+                'price': {'value': offer['price'], 'currency': 'EUR'},
+                'originalPrice': offer['originalPrice'],
+                'publisher': {'name': offer['store']},
+            }
+            for offer in offers
+        ]}}}, ensure_ascii=False).replace('</', '<\\/')
+        return (
+            self._page
+            .replace('{{query}}', html.escape(query))
+            .replace('{{cards}}', cards)
+            .replace('{{payload}}', payload)
+        )
+
+    def edeka_offers(self, query):
+        return self._edeka.replace('{{query}}', query.replace('"', ''))
+
+    def nominatim(self, query):
+        latitude, longitude = _coordinates(query)
+        results = json.loads(self._nominatim.replace('{{query}}', query.replace('"', '')))
+        for result in results:
+            result['lat'], result['lon'] = f"{latitude:.7f}", f"{longitude:.7f}"
+        return json.dumps(results)
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type):
+                data = body.encode('utf-8') if isinstance(body, str) else body
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                parts = urlsplit(self.path)
+                params = parse_qs(parts.query)
+                query = (params.get('query') or params.get('q') or [''])[0]
+                if parts.path.startswith('/webapp'):
+                    stub._count('meinprospekt')
+                    self._send(200, stub.search_page(query), 'text/html; charset=utf-8')
+                elif parts.path == '/api/offers':
+                    stub._count('edeka')
+                    self._send(200, stub.edeka_offers(query), 'application/json')
+                elif parts.path == '/search':
+                    stub._count('nominatim')
+                    self._send(200, stub.nominatim(query), 'application/json')
+                elif parts.path.startswith('/static/'):
+                    stub._count('static')
+                    self._send(200, b'\0' * 2048, 'application/octet-stream')
+                else:
+                    stub._count('not_found')
+                    self._send(404, 'not found', 'text/plain')
+
+        return Handler
@@ -4,6 +4,9 @@ from flask_sqlalchemy import SQLAlchemy
 from os import path
 from flask_login import LoginManager
 from flask_moment import Moment
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import sqlite3
 import re
 import os
 
@@ -11,6 +14,48 @@ db = SQLAlchemy()
 DB_NAME = "database.db"
 scheduler = APScheduler()
 
+# SQLite connection tuning; the scheduler thread, search workers and web requests all write concurrently
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 15000))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+    cursor.execute(f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+    cursor.execute(f'PRAGMA cache_size={-SQLITE_CACHE_SIZE_KB}')  # negative means KiB, not pages
+    cursor.close()
+
+def configure_database(app):
+    """Use DATABASE_URL when set (e.g. Postgres), otherwise the local SQLite file."""
+    database_url = os.getenv('DATABASE_URL')
+    if database_url and database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url or f'sqlite:///{DB_NAME}'
+
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'connect_args': {
+                'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+                'check_same_thread': False,
+            },
+        }
+    else:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+            'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+            'pool_pre_ping': True,
+        }
+
 def create_app():
     app = Flask(__name__, static_folder='static')
     moment = Moment(app)
@@ -19,7 +64,7 @@ def create_app():
     @app.template_filter('regex_replace')
     def regex_replace(s, find, replace):
         return re.sub(find, replace, s)
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_NAME}'
+    configure_database(app)
     db.init_app(app)
 
     from .views import views
@@ -30,8 +75,18 @@ def create_app():
 
     from .models import User, Note
     
+    from . import migrations
+    migrations.init_app(app)
+
+    from . import search_scheduler
+    from .job_queue import search_executor, web_search_executor
+    search_executor.init_app(app)
+    web_search_executor.init_app(app)
+
     with app.app_context():
         db.create_all()
+        migrations.upgrade_database()
+        search_scheduler.backfill_next_runs()
 
     login_manager = LoginManager()
     login_manager.login_view = 'auth.login'
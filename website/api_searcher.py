@@ -13,16 +13,28 @@ Returns:
     list: A list of formatted deal results.
 """
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
 from datetime import datetime
-from dataclasses import dataclass
-from typing import List
-from geopy.geocoders import Nominatim
+from dataclasses import dataclass, field
+from typing import Callable, List
 from dotenv import load_dotenv
-from website.models import ScraperResult, db
-from .email_service import send_email
+from .email_service import send_email, user_email
+from .geocoding import geocode_city
+from .http_session import get_session
+from .deals import save_deals
+from .offer_cache import retailer_cache, location_key
+from .price_history import record_offers
+from .metrics import count, run_record, timed
+from .job_queue import check_deadline, remaining_time
+from .matching import match_offers
 
-geolocator = Nominatim(user_agent="FindmyPrize_Flask")
+API_RETAILER_TIMEOUT = float(os.getenv("API_RETAILER_TIMEOUT", 5))  # seconds, per request
+API_SEARCH_DEADLINE = float(os.getenv("API_SEARCH_DEADLINE", 8))  # seconds, whole search
+API_FETCH_WORKERS = int(os.getenv("API_FETCH_WORKERS", 8))
+EDEKA_API_URL = os.getenv("EDEKA_API_URL", "https://www.edeka.de/api/offers")
+
+_fetch_pool = ThreadPoolExecutor(max_workers=API_FETCH_WORKERS, thread_name_prefix='retailer-fetch')
 
 @dataclass
 class DealFinding:
@@ -31,102 +43,138 @@ class DealFinding:
     product_name: str
     original_price: float = None
     discount: float = None
-    timestamp: datetime = datetime.now()
+    timestamp: datetime = field(default_factory=datetime.now)
+
+@dataclass
+class Retailer:
+    name: str
+    endpoint: str
+    processor: Callable[[dict], List[DealFinding]]
+    timeout: float = API_RETAILER_TIMEOUT
+
+# Retailer name -> Retailer; add new retailers with @register_retailer
+RETAILERS = {}
+
+def register_retailer(name, endpoint, timeout=API_RETAILER_TIMEOUT):
+    """Register a processor that turns a retailer's JSON response into a list of DealFinding offers."""
+    def decorator(processor):
+        RETAILERS[name] = Retailer(name, endpoint, processor, timeout)
+        return processor
+    return decorator
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+@register_retailer('edeka', EDEKA_API_URL)
+def process_edeka_response(response_data):
+    # Offers without a usable price cannot be compared to a target price and are skipped
+    return [
+        DealFinding(
+            store='EDEKA',
+            price=_as_float(item.get('price')),
+            product_name=item.get('name'),
+            original_price=_as_float(item.get('originalPrice')),
+            discount=item.get('discount')
+        )
+        for item in response_data.get('offers') or []
+        if _as_float(item.get('price')) is not None
+    ]
+
+def fetch_retailer(retailer, product, latitude, longitude):
+    params = {
+        'query': product,
+        'lat': latitude,
+        'lng': longitude
+    }
+    count('retailer_requests_total', retailer=retailer.name)
+    with timed('retailer_fetch', retailer=retailer.name):
+        response = get_session().get(retailer.endpoint, params=params, timeout=retailer.timeout)
+        response.raise_for_status()
+        return retailer.processor(response.json())
+
+def fetch_all_retailers(product, latitude, longitude, deadline=API_SEARCH_DEADLINE):
+    """Query every registered retailer concurrently.
+
+    Raw offers are served from `retailer_cache` when a retailer was asked for the same
+    product nearby within API_OFFER_CACHE_TTL. Returns whatever offers arrived before
+    `deadline`; failed or late retailers are skipped.
+    """
+    deadline = min(deadline, remaining_time(deadline))  # never wait past the running job's deadline
+    offers = []
+    futures = {}
+    for name, retailer in RETAILERS.items():
+        cached = retailer_cache.get((name,) + location_key(product, latitude, longitude))
+        if cached is not None:
+            count('retailer_cache_hits_total', retailer=name)
+            offers.extend(cached)
+        else:
+            future = _fetch_pool.submit(copy_context().run, fetch_retailer, retailer, product, latitude, longitude)
+            futures[future] = name
+
+    if not futures:
+        return offers
+    done, not_done = wait(futures, timeout=deadline)
+
+    for future in not_done:
+        future.cancel()
+        count('retailer_errors_total', retailer=futures[future], reason='deadline')
+        print(f"Deadline exceeded waiting for {futures[future]}. Returning partial results.")
+
+    fresh = []
+    for future in done:
+        try:
+            retailer_offers = future.result()
+            retailer_cache.put((futures[future],) + location_key(product, latitude, longitude), retailer_offers)
+            fresh.extend(retailer_offers)
+        except Exception as e:
+            # One retailer's failure (network or a malformed response) must not cost the others' offers
+            count('retailer_errors_total', retailer=futures[future], reason=type(e).__name__)
+            print(f"Error fetching data from {futures[future]}: {str(e)}")
+    count('offers_seen_total', len(fresh), source='retailer_api')
+    with timed('price_history'):
+        record_offers(fresh)
+    return offers + fresh
 
 def search_products(city, country, product, target_price, should_send_email, user_id=None):
-    # Your API search implementation here
+    with run_record('api_search', city=city, country=country, product=product):
+        return _search_products(city, country, product, target_price, should_send_email, user_id)
 
+def _search_products(city, country, product, target_price, should_send_email, user_id=None):
     # Get location coordinates
-    loc = geolocator.geocode(f"{city},{country}")
+    with timed('geocode'):
+        loc = geocode_city(city, country)
+    if loc is None:
+        count('geocode_failures_total')
+        print(f"Could not geocode {city}, {country}")
+        return []
     latitude = loc.latitude
     longitude = loc.longitude
     
-    collected_findings = []
-    
-    # API endpoints dictionary - can be expanded
-    API_ENDPOINTS = {
-        'edeka': 'https://www.edeka.de/api/offers',
-        # Add more API endpoints here
-    }
-    
-    def process_edeka_response(response_data):
-        deals = []
-        for item in response_data.get('offers', []):
-            price = float(item.get('price', 0))
-            if price <= target_price and product.lower() in item.get('name', '').lower():
-                deals.append(DealFinding(
-                    store='EDEKA',
-                    price=price,
-                    product_name=item.get('name'),
-                    original_price=float(item.get('originalPrice', 0)),
-                    discount=item.get('discount')
-                ))
-        return deals
-
-    def log_deal(finding: DealFinding):
-        # Check for duplicates
-        for existing in collected_findings:
-            if (existing.store == finding.store and 
-                existing.price == finding.price and 
-                existing.product_name == finding.product_name):
-                return
-
-        collected_findings.append(finding)
-        
-        # Log to database
-        existing_result = ScraperResult.query.filter_by(
-            store=finding.store,
-            price=finding.price,
-            product=finding.product_name,
-            target_price=target_price,
-            city=city,
-            country=country,
-            user_id=user_id
-        ).first()
-
-        if not existing_result:
-            scraper_result = ScraperResult(
-                store=finding.store,
-                price=finding.price,
-                product=finding.product_name,
-                target_price=target_price,
-                city=city,
-                country=country,
-                email_notification=should_send_email,
-                user_id=user_id,
-                data=f"Deal found: {finding.product_name} at {finding.store} for €{finding.price}",
-                timestamp=finding.timestamp
-            )
-            db.session.add(scraper_result)
-            db.session.commit()
-
-    # Search through each API endpoint
-    for retailer, endpoint in API_ENDPOINTS.items():
-        try:
-            params = {
-                'query': product,
-                'lat': latitude,
-                'lng': longitude
-            }
-            
-            response = requests.get(endpoint, params=params)
-            response.raise_for_status()
-            
-            if retailer == 'edeka':
-                deals = process_edeka_response(response.json())
-                for deal in deals:
-                    log_deal(deal)
-            # Add more retailer-specific processors here
-            
-        except requests.RequestException as e:
-            print(f"Error fetching data from {retailer}: {str(e)}")
-            continue
+    check_deadline()
+    with timed('retailers'):
+        offers = fetch_all_retailers(product, latitude, longitude)
+    # Offers at or below the target price whose name contains the product, ranked by discount, then price
+    with timed('matching'):
+        deals = match_offers(offers, target_price, product)
+    check_deadline()
+    collected_findings = save_deals(
+        deals,
+        target_price=target_price,
+        city=city,
+        country=country,
+        user_id=user_id,
+        email_notification=should_send_email,
+        describe=lambda finding: f"Deal found: {finding.product_name} at {finding.store} for €{finding.price}"
+    )
 
     # Send email if deals found
     if collected_findings and should_send_email:
         email_content = format_email_content(collected_findings, product, city, country, target_price)
         subject = f"Deal Alert Summary - {len(collected_findings)} deals found for {product}!"
-        send_email(subject, email_content, should_send_email)
+        send_email(subject, email_content, should_send_email, recipient=user_email(user_id))
 
     # Format results for web display
     return [
@@ -0,0 +1,155 @@
+"""
+Long-lived headless Chromium pool for the meinprospekt scraper.
+
+Launching Chromium for every search dominated scraper wall time, so browsers are
+kept alive and `run_scraper` borrows a fresh context/page per search instead.
+
+Playwright's sync API binds a browser to the thread that started it, so each
+thread that borrows pages keeps its own browser. The scraper borrows pages only on
+its SCRAPER_POOL_SIZE page worker threads (scrapper.py), so those own the browsers.
+SCRAPER_POOL_SIZE bounds how many pages are borrowed at once across all threads.
+Any other thread that returns a page while more than SCRAPER_POOL_SIZE browsers
+are open closes its own browser and Playwright driver, so no more than that many
+Chromium processes stay running between pages. A browser is recycled after
+serving `max_pages` pages or when it crashes (not on navigation errors).
+
+Usage:
+    with browser_pool.page() as page:
+        page.goto(url)
+"""
+import os
+import threading
+from contextlib import contextmanager
+from playwright.sync_api import sync_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from website.metrics import timed
+from website.job_queue import remaining_time
+
+SCRAPER_POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", 2))
+SCRAPER_MAX_PAGES_PER_BROWSER = int(os.getenv("SCRAPER_MAX_PAGES_PER_BROWSER", 50))
+SCRAPER_POOL_ACQUIRE_TIMEOUT = float(os.getenv("SCRAPER_POOL_ACQUIRE_TIMEOUT", 120))  # seconds
+
+LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage'
+]
+
+
+class BrowserPoolExhausted(Exception):
+    pass
+
+
+class BrowserPool:
+    def __init__(self, size=SCRAPER_POOL_SIZE, max_pages=SCRAPER_MAX_PAGES_PER_BROWSER,
+                 acquire_timeout=SCRAPER_POOL_ACQUIRE_TIMEOUT):
+        self.size = size
+        self.max_pages = max_pages
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'launches': 0,
+            'recycles': 0,
+            'crashes': 0,
+            'pages_served': 0,
+            'in_use': 0,
+            'browsers': 0,
+            'trims': 0,
+        }
+
+    def _bump(self, stat, amount=1):
+        with self._stats_lock:
+            self.stats[stat] += amount
+
+    def _launch(self):
+        local = self._local
+        with timed('browser_launch'):
+            if getattr(local, 'playwright', None) is None:
+                local.playwright = sync_playwright().start()
+            local.browser = local.playwright.chromium.launch(
+                headless=True,
+                chromium_sandbox=False,
+                args=LAUNCH_ARGS
+            )
+        local.pages_served = 0
+        self._bump('launches')
+        self._bump('browsers')
+        return local.browser
+
+    def _discard_browser(self):
+        browser = getattr(self._local, 'browser', None)
+        self._local.browser = None
+        if browser is not None:
+            self._bump('browsers', -1)
+            try:
+                browser.close()
+            except PlaywrightError:
+                pass  # already gone
+
+    def _over_capacity(self):
+        with self._stats_lock:
+            return self.stats['browsers'] > self.size
+
+    def _checkout_browser(self):
+        browser = getattr(self._local, 'browser', None)
+        if browser is None:
+            return self._launch()
+        if not browser.is_connected():
+            self._bump('crashes')
+            self._discard_browser()
+            return self._launch()
+        if self._local.pages_served >= self.max_pages:
+            self._bump('recycles')
+            self._discard_browser()
+            return self._launch()
+        return browser
+
+    @contextmanager
+    def page(self):
+        """Borrow a page in a fresh browser context; the context is closed on exit."""
+        # Never wait for a slot past the running job's deadline
+        acquire_timeout = min(self.acquire_timeout, remaining_time(self.acquire_timeout))
+        with timed('browser_slot_wait'):
+            acquired = self._slots.acquire(timeout=acquire_timeout)
+        if not acquired:
+            raise BrowserPoolExhausted(f"No browser slot free after {acquire_timeout:.0f}s")
+        self._bump('in_use')
+        try:
+            browser = self._checkout_browser()
+            context = browser.new_context()
+            self._local.pages_served += 1
+            self._bump('pages_served')
+            try:
+                yield context.new_page()
+            except PlaywrightTimeoutError:
+                raise
+            except PlaywrightError:
+                # Navigation errors (net::ERR_*) leave the browser usable; only relaunch after a crash
+                if not browser.is_connected():
+                    self._bump('crashes')
+                    self._discard_browser()
+                raise
+            finally:
+                try:
+                    context.close()
+                except PlaywrightError:
+                    pass
+            if self._over_capacity():
+                # Idle browsers can only be closed by their own thread, so trim here
+                self._bump('trims')
+                self.close()
+        finally:
+            self._bump('in_use', -1)
+            self._slots.release()
+
+    def close(self):
+        """Close the browser owned by the calling thread."""
+        self._discard_browser()
+        playwright = getattr(self._local, 'playwright', None)
+        self._local.playwright = None
+        if playwright is not None:
+            playwright.stop()
+
+
+browser_pool = BrowserPool()
@@ -0,0 +1,92 @@
+"""
+Streamed export of a user's deals as CSV or JSON Lines.
+
+Rows are read with `yield_per`, so only one batch of ScraperResult objects is in
+memory at a time, and the output is produced in chunks of roughly
+EXPORT_CHUNK_SIZE bytes. With `compress=True` each chunk goes through one
+incremental gzip stream, so large exports are compressed on the fly.
+
+Usage:
+    query = deals_export_query(user_id, since=date(2024, 1, 1), product='butter')
+    return Response(stream_with_context(export_chunks(query, 'jsonl', compress=True)), ...)
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime, time, timedelta
+from website.models import ScraperResult
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))  # rows per yield_per batch
+EXPORT_CHUNK_SIZE = 64 * 1024  # bytes handed to the response per write
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+EXPORT_FIELDS = ['id', 'date_created', 'store', 'product', 'price', 'target_price', 'city', 'country', 'data']
+
+
+def deals_export_query(user_id, since=None, until=None, product=None, store=None):
+    """The user's deals in id order; `since`/`until` are dates, both inclusive."""
+    query = ScraperResult.query.filter(ScraperResult.user_id == user_id)
+    if since:
+        query = query.filter(ScraperResult.date_created >= datetime.combine(since, time.min))
+    if until:
+        query = query.filter(ScraperResult.date_created < datetime.combine(until + timedelta(days=1), time.min))
+    if product:
+        query = query.filter(ScraperResult.product.contains(product))
+    if store:
+        query = query.filter(ScraperResult.store.contains(store))
+    return query.order_by(ScraperResult.id)
+
+
+def _record(deal):
+    return {
+        'id': deal.id,
+        'date_created': deal.date_created.isoformat() if deal.date_created else None,
+        'store': deal.store,
+        'product': deal.product,
+        'price': deal.price,
+        'target_price': deal.target_price,
+        'city': deal.city,
+        'country': deal.country,
+        'data': deal.data,
+    }
+
+
+def _text_chunks(query, fmt):
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+    for deal in query.yield_per(EXPORT_BATCH_SIZE):
+        if writer is not None:
+            writer.writerow(_record(deal))
+        else:
+            buffer.write(json.dumps(_record(deal)) + '\n')
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_chunks(query, fmt='csv', compress=False):
+    """Yield the export as bytes, gzip-compressed when `compress` is set."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    gzip = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+    for text in _text_chunks(query, fmt):
+        data = text.encode('utf-8')
+        if gzip is None:
+            yield data
+            continue
+        data = gzip.compress(data)
+        if data:
+            yield data
+    if gzip is not None:
+        yield gzip.flush()
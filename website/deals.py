@@ -0,0 +1,184 @@
+"""
+Batched persistence of found deals into `ScraperResult`.
+
+This is the only place ScraperResult deal rows are written. A search run hands
+all of its findings over at once: duplicates within the run are dropped with a
+set keyed on (store, price, product), rows already stored for the same search are
+found with one `dedup_key IN (...)` lookup against its unique index, and the
+remaining rows are inserted with a single commit. Each inserted row is then
+published to the user's live deal stream (see events.py).
+
+`dedup_key` is the row's idempotency key: a hash of (user, product, store, price,
+target price, city, country), so storing the same run twice is a no-op.
+`compact_duplicate_deals` backfills it for older rows and removes duplicates.
+
+Usage:
+    findings = save_deals(findings, target_price=2.5, city='Berlin', country='Germany',
+                          user_id=1, email_notification=True, describe=lambda f: f"...")
+"""
+import hashlib
+from datetime import datetime, timezone
+from sqlalchemy.exc import IntegrityError
+from website.models import ScraperResult, db
+from website.events import deal_events
+from website.metrics import count, timed
+
+# Keep each IN (...) under SQLite's default host-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def deal_dedup_key(user_id, product, store, price, target_price, city, country):
+    price = float(price) if price is not None else None
+    target_price = float(target_price) if target_price is not None else None
+    raw = '\x1f'.join(repr(part) for part in (user_id, product, store, price, target_price, city, country))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _deal_key(finding):
+    return (finding.store, finding.price, finding.product_name)
+
+
+def _existing_dedup_keys(keys):
+    existing = set()
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+        rows = db.session.query(ScraperResult.dedup_key).filter(ScraperResult.dedup_key.in_(chunk)).all()
+        existing.update(row[0] for row in rows)
+    return existing
+
+
+def serialize_deal(deal):
+    return {
+        'id': deal.id,
+        'store': deal.store,
+        'product': deal.product,
+        'price': deal.price,
+        'target_price': deal.target_price,
+        'city': deal.city,
+        'country': deal.country,
+        'date_created': deal.date_created.isoformat() if deal.date_created else None
+    }
+
+
+def _flushed_event(row):
+    # date_created is set explicitly on insert, so no refresh per row is needed after flush
+    return serialize_deal(row)
+
+
+def _insert_skipping_conflicts(rows):
+    # Another worker stored some of the same deals between lookup and insert
+    events = []
+    for row in rows:
+        row.id = None  # may hold an id assigned by the rolled-back batch flush
+        db.session.add(row)
+        try:
+            db.session.flush()
+            event = _flushed_event(row)
+            db.session.commit()
+            events.append(event)
+        except IntegrityError:
+            db.session.rollback()
+    return events
+
+
+def save_deals(findings, target_price, city, country, user_id, email_notification, describe=None):
+    """Store the findings of one search run and return them de-duplicated, in order.
+
+    `findings` need `store`, `price`, `product_name` and `timestamp` attributes.
+    `describe(finding)` builds the `data` text stored with each row.
+    """
+    unique = []
+    seen = set()
+    for finding in findings:
+        key = _deal_key(finding)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(finding)
+
+    if not unique:
+        return unique
+    with timed('db_write'):
+        _store_new_deals(unique, target_price, city, country, user_id, email_notification, describe)
+    return unique
+
+
+def _store_new_deals(unique, target_price, city, country, user_id, email_notification, describe):
+    dedup_keys = {
+        _deal_key(finding): deal_dedup_key(user_id, finding.product_name, finding.store, finding.price,
+                                           target_price, city, country)
+        for finding in unique
+    }
+    existing = _existing_dedup_keys(list(dedup_keys.values()))
+    # Naive UTC like the column's func.now() default on SQLite, so streamed and polled deals agree
+    created = datetime.now(timezone.utc).replace(tzinfo=None)
+    new_rows = [
+        ScraperResult(
+            store=finding.store,
+            price=finding.price,
+            product=finding.product_name,
+            target_price=target_price,
+            city=city,
+            country=country,
+            email_notification=email_notification,
+            user_id=user_id,
+            data=describe(finding) if describe else None,
+            timestamp=finding.timestamp,
+            date_created=created,
+            dedup_key=dedup_keys[_deal_key(finding)]
+        )
+        for finding in unique
+        if dedup_keys[_deal_key(finding)] not in existing
+    ]
+
+    if new_rows:
+        db.session.add_all(new_rows)
+        try:
+            db.session.flush()
+            events = [_flushed_event(row) for row in new_rows]
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            events = _insert_skipping_conflicts(new_rows)
+        for event in events:
+            deal_events.publish(user_id, event)
+    count('deals_logged_total', len(new_rows))
+    count('deals_duplicate_total', len(unique) - len(new_rows))
+
+
+def compact_duplicate_deals(batch_size=1000):
+    """One-off cleanup: backfill `dedup_key` on older rows and delete duplicate deals.
+
+    Keeps the oldest row of each duplicate group. Rows without store/price (e.g. the
+    "Geocoded: ..." notes) are not deals and are left untouched.
+    Returns (rows_keyed, rows_deleted).
+    """
+    seen = set()
+    to_delete = []
+    to_key = []
+    rows = db.session.query(
+        ScraperResult.id, ScraperResult.dedup_key, ScraperResult.user_id, ScraperResult.product,
+        ScraperResult.store, ScraperResult.price, ScraperResult.target_price,
+        ScraperResult.city, ScraperResult.country
+    ).filter(
+        ScraperResult.store.isnot(None),
+        ScraperResult.price.isnot(None)
+    ).order_by(ScraperResult.id).yield_per(batch_size)
+
+    for row in rows:
+        key = deal_dedup_key(row.user_id, row.product, row.store, row.price,
+                             row.target_price, row.city, row.country)
+        if key in seen:
+            to_delete.append(row.id)
+        else:
+            seen.add(key)
+            if row.dedup_key != key:
+                to_key.append({'id': row.id, 'dedup_key': key})
+
+    for start in range(0, len(to_delete), LOOKUP_CHUNK_SIZE):
+        chunk = to_delete[start:start + LOOKUP_CHUNK_SIZE]
+        ScraperResult.query.filter(ScraperResult.id.in_(chunk)).delete(synchronize_session=False)
+    for start in range(0, len(to_key), batch_size):
+        db.session.bulk_update_mappings(ScraperResult, to_key[start:start + batch_size])
+    db.session.commit()
+    return len(to_key), len(to_delete)
@@ -3,8 +3,19 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
+from .metrics import count, timed
+from .models import User
 
-def send_email(subject, message, should_send_email):
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") not in ("0", "false", "no")
+
+def user_email(user_id):
+    """Address of the user a search belongs to; None falls back to RECIPIENT_EMAIL."""
+    user = User.query.get(user_id) if user_id is not None else None
+    return user.email if user else None
+
+def send_email(subject, message, should_send_email, recipient=None):
     if should_send_email:
         load_dotenv()
         EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
@@ -13,7 +24,7 @@ def send_email(subject, message, should_send_email):
 
         sender_email = EMAIL_ADDRESS
         sender_password = EMAIL_PASSWORD
-        receiver_email = RECIPIENT_EMAIL
+        receiver_email = recipient or RECIPIENT_EMAIL
 
         msg = MIMEMultipart()
         msg["From"] = sender_email
@@ -21,9 +32,17 @@ def send_email(subject, message, should_send_email):
         msg["Subject"] = subject
         msg.attach(MIMEText(message, "plain"))
 
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, receiver_email, text)
-        server.quit()
+        try:
+            with timed('smtp'):
+                server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
+                if SMTP_STARTTLS:
+                    server.starttls()
+                if sender_password:
+                    server.login(sender_email, sender_password)
+                text = msg.as_string()
+                server.sendmail(sender_email, receiver_email, text)
+                server.quit()
+        except (smtplib.SMTPException, OSError):
+            count('email_errors_total')
+            raise
+        count('emails_sent_total')
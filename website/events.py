@@ -0,0 +1,51 @@
+"""
+In-process publish/subscribe channel for newly stored deals.
+
+`deals.save_deals` publishes every inserted ScraperResult here, and the
+`/deals/stream` server-sent-events route subscribes one queue per open browser
+tab. The broker lives in process memory, so it reaches clients served by the
+same process as the scheduler/search that stored the deal.
+"""
+import queue
+import threading
+from collections import defaultdict
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class DealBroker:
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)  # user_id -> {queue.Queue}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                pass  # client stopped reading; it catches up via /get-deals on reconnect
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+deal_events = DealBroker()
@@ -0,0 +1,168 @@
+"""
+Cached geocoding shared by the scraper, the API searcher and the views.
+
+Lookups go through an in-memory LRU first, then the persistent `GeocodeCache`
+table, and only hit Nominatim on a miss. Failed lookups are cached too (with a
+shorter TTL) so a misspelled city does not hammer the geocoder on every
+scheduled run.
+
+Usage:
+    loc = geocode_city(city, country)
+    if loc:
+        lat, lng = loc.latitude, loc.longitude
+"""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from flask import has_app_context
+from geopy.geocoders import Nominatim
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from website.models import GeocodeCache, db
+
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", 512))
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", 30 * 24 * 3600))  # seconds
+GEOCODE_NEGATIVE_TTL = int(os.getenv("GEOCODE_NEGATIVE_TTL", 3600))  # seconds
+NOMINATIM_DOMAIN = os.getenv("NOMINATIM_DOMAIN", "nominatim.openstreetmap.org")
+NOMINATIM_SCHEME = os.getenv("NOMINATIM_SCHEME", "https")
+
+geolocator = Nominatim(user_agent="FindmyPrize_Flask", timeout=10, domain=NOMINATIM_DOMAIN, scheme=NOMINATIM_SCHEME)
+
+_NOT_FOUND = object()
+_lock = threading.Lock()
+_memory = OrderedDict()  # key -> (GeocodedLocation or _NOT_FOUND, stored_at)
+
+cache_stats = {
+    'memory_hits': 0,
+    'db_hits': 0,
+    'negative_hits': 0,
+    'misses': 0,
+}
+
+
+@dataclass(frozen=True)
+class GeocodedLocation:
+    latitude: float
+    longitude: float
+    address: str
+
+
+def normalize_key(location_string):
+    parts = [' '.join(part.split()).lower() for part in location_string.split(',')]
+    return ','.join(part for part in parts if part)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _is_fresh(value, stored_at):
+    ttl = GEOCODE_NEGATIVE_TTL if value is _NOT_FOUND else GEOCODE_CACHE_TTL
+    if stored_at.tzinfo is not None:
+        stored_at = stored_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return (_utcnow() - stored_at).total_seconds() < ttl
+
+
+def _count(stat):
+    with _lock:
+        cache_stats[stat] += 1
+
+
+def _memory_get(key):
+    with _lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        if not _is_fresh(*entry):
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return entry[0]
+
+
+def _memory_put(key, value, stored_at):
+    with _lock:
+        _memory[key] = (value, stored_at)
+        _memory.move_to_end(key)
+        while len(_memory) > GEOCODE_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+
+def _db_get(key):
+    if not has_app_context():
+        return None
+    row = GeocodeCache.query.get(key)
+    if row is None:
+        return None
+    value = GeocodedLocation(row.latitude, row.longitude, row.address) if row.found else _NOT_FOUND
+    if not _is_fresh(value, row.updated_at):
+        return None
+    return value, row.updated_at
+
+
+def _db_put(key, value, stored_at):
+    """Store a lookup result; a failed cache write is logged and never fails the search."""
+    if not has_app_context():
+        return
+    found = value is not _NOT_FOUND
+    fields = {
+        'found': found,
+        'latitude': value.latitude if found else None,
+        'longitude': value.longitude if found else None,
+        'address': value.address if found else None,
+        'updated_at': stored_at,
+    }
+    for attempt in range(2):
+        try:
+            row = GeocodeCache.query.get(key) or GeocodeCache(key=key)
+            for name, field_value in fields.items():
+                setattr(row, name, field_value)
+            db.session.add(row)
+            db.session.commit()
+            return
+        except IntegrityError:
+            # Another worker inserted the same key first; the retry updates its row
+            db.session.rollback()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Could not cache geocode result for {key}: {e}")
+            return
+    print(f"Could not cache geocode result for {key}: concurrent writes")
+
+
+def geocode(location_string):
+    """Return a `GeocodedLocation` for a free-form address, or None if it cannot be found.
+
+    Geocoder exceptions (timeouts, service errors) propagate and are not cached.
+    """
+    key = normalize_key(location_string)
+
+    value = _memory_get(key)
+    if value is not None:
+        _count('negative_hits' if value is _NOT_FOUND else 'memory_hits')
+        return None if value is _NOT_FOUND else value
+
+    entry = _db_get(key)
+    if entry is not None:
+        value, stored_at = entry
+        _memory_put(key, value, stored_at)
+        _count('negative_hits' if value is _NOT_FOUND else 'db_hits')
+        return None if value is _NOT_FOUND else value
+
+    _count('misses')
+    loc = geolocator.geocode(location_string)
+    value = GeocodedLocation(loc.latitude, loc.longitude, loc.address) if loc else _NOT_FOUND
+    stored_at = _utcnow()
+    _memory_put(key, value, stored_at)
+    _db_put(key, value, stored_at)
+    return None if value is _NOT_FOUND else value
+
+
+def geocode_city(city, country):
+    return geocode(f"{city},{country}")
+
+
+def clear_memory_cache():
+    with _lock:
+        _memory.clear()
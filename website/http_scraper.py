@@ -0,0 +1,153 @@
+"""
+Browserless fast path for meinprospekt search results.
+
+Fetches the same search URL as the Playwright scraper over the shared HTTP session
+(http_session.py) and looks for offers in two places:
+
+1. JSON embedded in the page (`<script type="application/json">`, `__NEXT_DATA__`,
+   `window.__INITIAL_STATE__ = {...}`): any object carrying a title, a price and a
+   store/publisher is taken as an offer.
+2. The server-rendered offer cards, parsed with lxml (optional dependency) using the
+   same class names the browser path queries.
+
+Both return the records the browser's batch extraction returns ({'store', 'price',
+'title'} with the price as display text), so scrapper.py turns either into `Offer`s
+with the same parsing. An empty result means "not found here", and the caller
+decides whether to fall back to the browser.
+
+Usage:
+    records = fetch_offer_records('butter', 52.52, 13.40)  # None on HTTP failure
+"""
+import json
+import os
+import re
+import requests
+from website.http_session import get_session
+from website.metrics import timed
+from website.job_queue import remaining_time
+
+try:
+    from lxml import etree as lxml_etree, html as lxml_html
+except ImportError:  # optional; embedded JSON is still parsed without it
+    lxml_etree = lxml_html = None
+
+SCRAPER_HTTP_TIMEOUT = float(os.getenv("SCRAPER_HTTP_TIMEOUT", 10))  # seconds
+SEARCH_URL = os.getenv("MEINPROSPEKT_URL", "https://www.meinprospekt.de/webapp/")
+
+# Sent with the search request only; the session's own headers are kept for retailer APIs
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/json;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'de-DE,de;q=0.9',
+}
+
+_JSON_SCRIPT = re.compile(
+    r'<script[^>]*type="application/(?:ld\+)?json"[^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE
+)
+_STATE_ASSIGNMENT = re.compile(r'window\.__[A-Z_]+__\s*=\s*(\{.*?\})\s*;?\s*</script>', re.DOTALL)
+
+_TITLE_KEYS = ('title', 'name', 'productName')
+_STORE_KEYS = ('publisherName', 'retailerName', 'storeName', 'publisher', 'retailer', 'store', 'brand')
+_PRICE_KEYS = ('price', 'currentPrice', 'salesPrice')
+_PRICE_VALUE_KEYS = ('value', 'amount', 'price')
+
+
+def _text(value):
+    if isinstance(value, dict):
+        value = value.get('name') or value.get('title')
+    return ' '.join(value.split()) if isinstance(value, str) else None
+
+
+def _price_text(value):
+    if isinstance(value, dict):
+        value = next((value[key] for key in _PRICE_VALUE_KEYS if value.get(key) is not None), None)
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return f"{value:.2f} €".replace('.', ',')
+    value = str(value).strip()
+    return value if re.search(r'\d', value) else None
+
+
+def _record_from_json(item):
+    title = next((_text(item[key]) for key in _TITLE_KEYS if key in item), None)
+    store = next((_text(item[key]) for key in _STORE_KEYS if key in item), None)
+    price = next((_price_text(item[key]) for key in _PRICE_KEYS if key in item), None)
+    if title and store and price:
+        return {'store': store, 'price': price, 'title': title}
+    return None
+
+
+def _walk_json(data, records):
+    if isinstance(data, dict):
+        record = _record_from_json(data)
+        if record is not None:
+            records.append(record)
+            return
+        for value in data.values():
+            _walk_json(value, records)
+    elif isinstance(data, list):
+        for value in data:
+            _walk_json(value, records)
+
+
+def records_from_embedded_json(page_html):
+    records = []
+    payloads = _JSON_SCRIPT.findall(page_html) + _STATE_ASSIGNMENT.findall(page_html)
+    for payload in payloads:
+        try:
+            _walk_json(json.loads(payload), records)
+        except ValueError:
+            continue
+    return records
+
+
+def _class_xpath(class_name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def _first_text(element, class_name):
+    found = element.xpath(f".//*[{_class_xpath(class_name)}]")
+    return ' '.join(found[0].text_content().split()) if found else None
+
+
+def records_from_cards(page_html):
+    if lxml_html is None or not page_html.strip():
+        return []
+    try:
+        document = lxml_html.fromstring(page_html)
+    except (lxml_etree.LxmlError, ValueError) as e:
+        # Unparseable body: report no offers so the browser fallback runs
+        print(f"Could not parse meinprospekt page: {e}")
+        return []
+    cards = document.xpath(
+        f"//*[{_class_xpath('search-group-grid-content')}]"
+        f"//*[{_class_xpath('card')} and {_class_xpath('card--offer')} and {_class_xpath('slider-preventClick')}]"
+    )
+    return [
+        {
+            'store': _first_text(card, 'card__subtitle'),
+            'price': _first_text(card, 'card__prices-main-price'),
+            'title': _first_text(card, 'card__title'),
+        }
+        for card in cards
+    ]
+
+
+def fetch_offer_records(product, lat, lng):
+    """Offer records for `product` around (lat, lng) without a browser; None if the request failed."""
+    try:
+        with timed('http_fetch'):
+            response = get_session().get(
+                SEARCH_URL,
+                params={'query': product, 'lat': lat, 'lng': lng},
+                headers=BROWSER_HEADERS,
+                timeout=max(min(SCRAPER_HTTP_TIMEOUT, remaining_time(SCRAPER_HTTP_TIMEOUT)), 0.1)
+            )
+            response.raise_for_status()
+            page_html = response.text
+    except requests.RequestException as e:
+        print(f"HTTP fetch for {product} failed: {e}")
+        return None
+    with timed('http_parse'):
+        return records_from_embedded_json(page_html) or records_from_cards(page_html)
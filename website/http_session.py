@@ -0,0 +1,114 @@
+"""
+Shared HTTP session for outbound retailer requests.
+
+One module-level `requests.Session` keeps TCP/TLS connections alive between
+searches instead of paying a fresh handshake per retailer per search. The
+mounted adapter limits connections per host, and retries idempotent requests
+on 429/5xx with jittered exponential backoff, honoring `Retry-After`. Retry waits
+are capped at HTTP_RETRY_WAIT_MAX seconds, and a retry whose wait would run past
+the current job's deadline (job_queue.py) is not made: the last response is
+returned instead.
+
+Usage:
+    response = get_session().get(url, params=params, timeout=5)
+"""
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from website.job_queue import remaining_time
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 10))  # distinct hosts kept pooled
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 10))  # connections per host
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", 0.5))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", 0.3))
+HTTP_RETRY_WAIT_MAX = float(os.getenv("HTTP_RETRY_WAIT_MAX", 5))  # seconds, caps Retry-After and backoff
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_adapter = None
+_lock = threading.Lock()
+
+
+class _BoundedRetry(Retry):
+    """Retry that sleeps on the caller's thread, so its waits are capped and kept inside the job deadline."""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, HTTP_RETRY_WAIT_MAX)
+
+    def get_backoff_time(self):
+        return min(super().get_backoff_time(), HTTP_RETRY_WAIT_MAX)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        # Same choice as Retry.sleep: Retry-After if the response has one, backoff otherwise
+        retry_after = None
+        if response is not None and retry.respect_retry_after_header:
+            retry_after = retry.get_retry_after(response)
+        wait = retry_after or retry.get_backoff_time()
+        if wait > remaining_time(wait):
+            # With raise_on_status=False the pool hands back the last response instead
+            raise MaxRetryError(_pool, url, ResponseError(f"retry in {wait:.1f}s would pass the job deadline"))
+        return retry
+
+
+def _build_retry():
+    retry_kwargs = dict(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    try:
+        return _BoundedRetry(backoff_jitter=HTTP_BACKOFF_JITTER, **retry_kwargs)
+    except TypeError:
+        # urllib3 < 2 has no backoff_jitter; plain exponential backoff still applies
+        return _BoundedRetry(**retry_kwargs)
+
+
+def get_session():
+    global _session, _adapter
+    if _session is None:
+        with _lock:
+            if _session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    pool_block=True,
+                    max_retries=_build_retry()
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    'User-Agent': 'FindmyPrize_Flask',
+                    'Accept-Encoding': 'gzip, deflate',
+                    'Connection': 'keep-alive',
+                })
+                _adapter = adapter
+                _session = session
+    return _session
+
+
+def connection_stats():
+    """Requests sent vs. connections opened across all pooled hosts."""
+    stats = {'hosts': 0, 'requests': 0, 'new_connections': 0, 'reused_connections': 0}
+    if _adapter is None:
+        return stats
+    pools = _adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        stats['hosts'] += 1
+        stats['requests'] += pool.num_requests
+        stats['new_connections'] += pool.num_connections
+    stats['reused_connections'] = max(stats['requests'] - stats['new_connections'], 0)
+    return stats
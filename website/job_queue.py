@@ -0,0 +1,212 @@
+"""
+Bounded worker pool for searches that should not run on the caller's thread.
+
+APScheduler ticks and cron jobs only enqueue work here; a fixed number of worker
+threads execute it.
+
+Jobs are coalesced by key: an item submitted while a job with the same key is
+still queued joins that job, and an item that is already queued or running is not
+queued again. A job's function receives all of its items at once, so e.g. every
+due saved search for a (city, country) runs in one scraper batch.
+
+Timeouts are cooperative: threads cannot be killed, so long-running job code calls
+`check_deadline()` between units of work (the scraper does so between products) and
+bounds its own waits with `remaining_time()`. The deadline is a context variable, so
+helper threads started with `contextvars.copy_context().run` see it too. A job past
+its deadline reports `timed_out` from `to_dict()` right away, even while its thread
+is still unwinding.
+
+Usage:
+    job = search_executor.submit(('saved_search', city, country), run_saved_searches, search.id)
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", 2))
+SEARCH_QUEUE_SIZE = int(os.getenv("SEARCH_QUEUE_SIZE", 200))
+SEARCH_JOB_TIMEOUT = float(os.getenv("SEARCH_JOB_TIMEOUT", 300))  # seconds
+WEB_SEARCH_WORKERS = int(os.getenv("WEB_SEARCH_WORKERS", 4))
+WEB_SEARCH_QUEUE_SIZE = int(os.getenv("WEB_SEARCH_QUEUE_SIZE", 100))
+WEB_SEARCH_JOB_TIMEOUT = float(os.getenv("WEB_SEARCH_JOB_TIMEOUT", 60))  # seconds
+FINISHED_JOBS_KEPT = 500
+
+_deadline = ContextVar('job_deadline', default=None)  # time.monotonic() value
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def check_deadline():
+    """Raise JobTimeout if the current job is past its deadline."""
+    deadline = _deadline.get()
+    if deadline is not None and time.monotonic() > deadline:
+        raise JobTimeout()
+
+
+def remaining_time(default=None):
+    """Seconds left before the current job's deadline (at least 0), or `default` outside a job."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return max(deadline - time.monotonic(), 0.0)
+
+
+class Job:
+    def __init__(self, key, func, timeout, owner=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.func = func
+        self.owner = owner  # user id allowed to read the job's status/result
+        self.items = []
+        self.timeout = timeout
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def overdue(self):
+        return (self.status == 'running' and self.started_at is not None
+                and time.monotonic() > self.started_at + self.timeout)
+
+    def to_dict(self):
+        overdue = self.overdue
+        return {
+            'id': self.id,
+            'status': 'timed_out' if overdue else self.status,
+            'result': self.result,
+            'error': f"Timed out after {self.timeout:.0f}s" if overdue else self.error,
+        }
+
+
+class SearchExecutor:
+    def __init__(self, workers=SEARCH_WORKERS, max_queued=SEARCH_QUEUE_SIZE, timeout=SEARCH_JOB_TIMEOUT,
+                 name='search'):
+        self.name = name
+        self.workers = workers
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.app = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'{name}-worker')
+        self._lock = threading.Lock()
+        self._queued = {}  # key -> Job not yet started
+        self._in_flight = {}  # (key, item) -> Job queued or running
+        self._jobs = OrderedDict()  # id -> Job, most recent last
+        self.stats = {
+            'submitted': 0,
+            'coalesced': 0,
+            'rejected': 0,
+            'completed': 0,
+            'failed': 0,
+            'timed_out': 0,
+            'queued': 0,
+            'running': 0,
+            'max_queued': 0,
+            'queue_wait_seconds': 0.0,
+            'run_seconds': 0.0,
+        }
+
+    def init_app(self, app):
+        self.app = app
+
+    def submit(self, key, func, item, timeout=None, owner=None):
+        with self._lock:
+            self.stats['submitted'] += 1
+            job = self._in_flight.get((key, item))
+            if job is not None:
+                self.stats['coalesced'] += 1
+                return job
+            job = self._queued.get(key)
+            if job is not None and job.func is func:
+                job.items.append(item)
+                self._in_flight[(key, item)] = job
+                self.stats['coalesced'] += 1
+                return job
+            if self.stats['queued'] >= self.max_queued:
+                self.stats['rejected'] += 1
+                raise QueueFull(f"{self.stats['queued']} jobs already queued")
+            job = Job(key, func, timeout or self.timeout, owner)
+            job.items.append(item)
+            self._queued[key] = job
+            self._in_flight[(key, item)] = job
+            self._remember(job)
+            self.stats['queued'] += 1
+            self.stats['max_queued'] = max(self.stats['max_queued'], self.stats['queued'])
+        self._pool.submit(self._run, job)
+        return job
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > FINISHED_JOBS_KEPT:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in ('queued', 'running'):
+                break
+            del self._jobs[oldest_id]
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        with self._lock:
+            if self._queued.get(job.key) is job:
+                del self._queued[job.key]
+            job.status = 'running'
+            job.started_at = time.monotonic()
+            self.stats['queued'] -= 1
+            self.stats['running'] += 1
+            self.stats['queue_wait_seconds'] += job.started_at - job.submitted_at
+            items = list(job.items)
+
+        token = _deadline.set(job.started_at + job.timeout)
+        try:
+            with self.app.app_context():
+                job.result = job.func(items)
+            job.status = 'done'
+        except JobTimeout:
+            job.status = 'timed_out'
+            job.error = f"Timed out after {job.timeout:.0f}s"
+            print(f"{self.name} job {job.key} timed out after {job.timeout:.0f}s")
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            print(f"{self.name} job {job.key} failed: {e}")
+        finally:
+            _deadline.reset(token)
+            job.finished_at = time.monotonic()
+            with self._lock:
+                for item in items:
+                    if self._in_flight.get((job.key, item)) is job:
+                        del self._in_flight[(job.key, item)]
+                self.stats['running'] -= 1
+                self.stats['run_seconds'] += job.finished_at - job.started_at
+                stat = {'done': 'completed', 'failed': 'failed', 'timed_out': 'timed_out'}[job.status]
+                self.stats[stat] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+
+# Scheduled searches
+search_executor = SearchExecutor()
+
+# Searches started from the web UI, kept apart so they never queue behind scheduled scrapes
+web_search_executor = SearchExecutor(
+    workers=WEB_SEARCH_WORKERS,
+    max_queued=WEB_SEARCH_QUEUE_SIZE,
+    timeout=WEB_SEARCH_JOB_TIMEOUT,
+    name='web-search'
+)
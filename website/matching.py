@@ -0,0 +1,110 @@
+"""
+Batched deal matching: many users' target prices and name filters against one set of offers.
+
+`OfferMatrix` holds the offers of one fetch in columns (price, discount, lowercased
+name). `match` evaluates every query in one pass, as a (queries x offers) boolean
+mask when NumPy is installed and with plain loops otherwise, and returns each
+query's matching offers ranked by discount (highest first), then price (lowest
+first). Offer objects need `price` and `product_name`; `discount` and
+`original_price` are used for ranking when present.
+
+Usage:
+    matrix = OfferMatrix(offers)
+    per_search = matrix.match([search.target_price for search in searches])
+    deals = match_offers(offers, target_price, product='butter')
+"""
+try:
+    import numpy as np
+except ImportError:  # optional; the pure-Python path gives the same results
+    np = None
+
+
+def _discount(offer):
+    discount = getattr(offer, 'discount', None)
+    if discount:
+        try:
+            return float(discount)
+        except (TypeError, ValueError):
+            pass
+    original_price = getattr(offer, 'original_price', None)
+    if original_price and original_price > offer.price:
+        return (original_price - offer.price) / original_price * 100
+    return 0.0
+
+
+def _normalize(text):
+    return (text or '').lower()
+
+
+class OfferMatrix:
+    def __init__(self, offers):
+        self.offers = list(offers)
+        prices = [float(offer.price) for offer in self.offers]
+        discounts = [_discount(offer) for offer in self.offers]
+        self._names = [_normalize(offer.product_name) for offer in self.offers]
+        # Highest discount first, then lowest price; Python's sort is stable, like lexsort
+        self._rank = sorted(range(len(self.offers)), key=lambda i: (-discounts[i], prices[i]))
+        if np is not None:
+            self._prices = np.array(prices, dtype=np.float64)
+            self._rank_array = np.array(self._rank, dtype=np.intp)
+            self._name_array = np.array(self._names, dtype=np.str_) if self._names else None
+        else:
+            self._prices = prices
+
+    def __len__(self):
+        return len(self.offers)
+
+    def match(self, target_prices, needles=None):
+        """Return one ranked list of offers per target price.
+
+        `needles`, when given, holds one substring per query (None for no name
+        filter) that the offer's product name must contain, case-insensitively.
+        """
+        target_prices = [float(price) for price in target_prices]
+        if needles is None:
+            needles = [None] * len(target_prices)
+        if not self.offers or not target_prices:
+            return [[] for _ in target_prices]
+        if np is not None:
+            return self._match_numpy(target_prices, needles)
+        return self._match_python(target_prices, needles)
+
+    def _name_masks(self, needles):
+        # Distinct needles only: many users usually search the same product
+        masks = {}
+        for needle in set(needles):
+            if needle is None:
+                continue
+            needle = _normalize(needle)
+            if np is not None:
+                masks[needle] = np.char.find(self._name_array, needle) >= 0
+            else:
+                masks[needle] = [needle in name for name in self._names]
+        return masks
+
+    def _match_numpy(self, target_prices, needles):
+        mask = self._prices[np.newaxis, :] <= np.array(target_prices)[:, np.newaxis]
+        for needle, name_mask in self._name_masks(needles).items():
+            rows = [i for i, n in enumerate(needles) if n is not None and _normalize(n) == needle]
+            mask[rows] &= name_mask
+        ranked = mask[:, self._rank_array]
+        return [
+            [self.offers[i] for i in self._rank_array[row]]
+            for row in ranked
+        ]
+
+    def _match_python(self, target_prices, needles):
+        name_masks = self._name_masks(needles)
+        results = []
+        for target_price, needle in zip(target_prices, needles):
+            name_mask = name_masks[_normalize(needle)] if needle is not None else None
+            results.append([
+                self.offers[i] for i in self._rank
+                if self._prices[i] <= target_price and (name_mask is None or name_mask[i])
+            ])
+        return results
+
+
+def match_offers(offers, target_price, product=None):
+    """Ranked offers at or below `target_price` (and naming `product`, if given)."""
+    return OfferMatrix(offers).match([target_price], [product])[0]
@@ -0,0 +1,177 @@
+"""
+Stage timers, counters and the Prometheus text behind `/metrics`.
+
+`timed(stage)` records how long a pipeline stage took (geocode, browser_launch,
+navigation, extraction, http_fetch, retailer_fetch, db_write, smtp, ...) into a
+histogram; `count(name)` increments a labelled counter. Both also land in the
+current run record: `run_record(kind)` wraps one scraper batch,
+API search or scheduler tick and, when it ends, prints one JSON line with the run's
+stage timings and counters, so a slow search shows where its time went.
+
+`render_prometheus()` adds the stats the other modules already keep (geocoding
+cache, HTTP connection reuse, search executors, offer caches, browser pool,
+scraper traffic and backends) as gauges.
+
+Usage:
+    with run_record('scraper', city=city) as run:
+        with timed('geocode'):
+            loc = geocode_city(city, country)
+        count('offers_seen_total', len(offers), source='meinprospekt')
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+METRICS_PREFIX = 'findmyprize'
+METRICS_RUN_LOG = os.getenv("METRICS_RUN_LOG", "1") not in ("0", "false", "no")
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_stages = {}  # (stage, labels) -> [per-bucket counts..., +Inf count, sum]
+_counters = {}  # (name, labels) -> value
+# The innermost active run; worker threads join it when submitted with contextvars.copy_context().run
+_current_run = ContextVar('metrics_run', default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def observe(stage, seconds, **labels):
+    key = (stage, _label_key(labels))
+    with _lock:
+        state = _stages.get(key)
+        if state is None:
+            state = _stages[key] = [0] * (len(STAGE_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(STAGE_BUCKETS):
+            if seconds <= bound:
+                state[i] += 1
+        state[len(STAGE_BUCKETS)] += 1
+        state[-1] += seconds
+        run = _current_run.get()
+        if run is not None:
+            run['stages'][stage] = round(run['stages'].get(stage, 0.0) + seconds, 4)
+
+
+@contextmanager
+def timed(stage, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - started, **labels)
+
+
+def count(name, amount=1, **labels):
+    if not amount:
+        return
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+        run = _current_run.get()
+        if run is not None:
+            run_name = name + ''.join(f"[{value}]" for _, value in key[1])
+            run['counters'][run_name] = run['counters'].get(run_name, 0) + amount
+
+
+@contextmanager
+def run_record(kind, **fields):
+    """Collect stage timings and counters for one run; log them as one JSON line on exit."""
+    record = {'run': kind, **fields, 'stages': {}, 'counters': {}, 'status': 'ok'}
+    token = _current_run.set(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_run.reset(token)
+        record['seconds'] = round(time.perf_counter() - started, 4)
+        observe(f"run:{kind}", record['seconds'])
+        if METRICS_RUN_LOG:
+            print(json.dumps(record, default=str))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _gauge_sources():
+    """(metric, help, label name, {label value: number}) for stats kept elsewhere in the app."""
+    from website.geocoding import cache_stats
+    from website.http_session import connection_stats
+    from website.job_queue import search_executor, web_search_executor
+    from website.offer_cache import scrape_cache, retailer_cache
+    from website.browser_pool import browser_pool
+    from website.page_profile import traffic_totals
+    from website.scrapper import backend_stats
+
+    sources = [
+        ('geocode_cache', 'Geocoding lookups by where they were answered', 'result', dict(cache_stats)),
+        ('http_connections', 'Outbound HTTP requests and pooled connections', 'stat', connection_stats()),
+        ('browser_pool', 'Browser pool launches, recycles, crashes and pages', 'stat', dict(browser_pool.stats)),
+        ('scraper_traffic', 'Requests and bytes of scraper pages since start', 'stat', traffic_totals.snapshot()),
+        ('scraper_backend', 'Products served by the HTTP fast path vs. the browser', 'stat', dict(backend_stats)),
+    ]
+    for executor in (search_executor, web_search_executor):
+        sources.append((
+            'executor', 'Search worker queue statistics', 'stat',
+            {'executor': executor.name, **executor.snapshot()}
+        ))
+    for name, cache in (('scrape', scrape_cache), ('retailer', retailer_cache)):
+        sources.append((
+            'offer_cache', 'Shared offer cache hits, misses and size', 'stat',
+            {'cache': name, 'entries': len(cache), **cache.stats}
+        ))
+    return sources
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        stages = sorted(_stages.items())
+        counters = sorted(_counters.items())
+
+    metric = f"{METRICS_PREFIX}_stage_seconds"
+    lines.append(f"# HELP {metric} Time spent per pipeline stage")
+    lines.append(f"# TYPE {metric} histogram")
+    for (stage, labels), state in stages:
+        base = (('stage', stage),) + labels
+        for bound, bucket_count in zip(STAGE_BUCKETS, state):
+            lines.append(f"{metric}_bucket{_format_labels(base + (('le', str(bound)),))} {bucket_count}")
+        lines.append(f"{metric}_bucket{_format_labels(base + (('le', '+Inf'),))} {state[len(STAGE_BUCKETS)]}")
+        lines.append(f"{metric}_sum{_format_labels(base)} {state[-1]:.6f}")
+        lines.append(f"{metric}_count{_format_labels(base)} {state[len(STAGE_BUCKETS)]}")
+
+    typed = set()
+    for (name, labels), value in counters:
+        metric = f"{METRICS_PREFIX}_{name}"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+    for name, help_text, label, stats in _gauge_sources():
+        metric = f"{METRICS_PREFIX}_{name}"
+        if metric not in typed:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            typed.add(metric)
+        # String values (executor/cache names) become labels of the numeric ones
+        fixed = tuple((key, value) for key, value in stats.items() if isinstance(value, str))
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"{metric}{_format_labels(fixed + ((label, key),))} {value}")
+    return '\n'.join(lines) + '\n'
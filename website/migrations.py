@@ -0,0 +1,130 @@
+"""
+In-place schema upgrades for existing databases.
+
+`db.create_all()` only creates missing tables, so a database created by an older
+version (e.g. instance/database.db) never receives columns or indexes added to
+the models later. `upgrade_database` compares the live schema with the models
+and adds whatever is missing; it is idempotent and runs on every app start.
+
+`audit_query_plans` runs EXPLAIN QUERY PLAN (SQLite only) for the hot queries and
+reports which index each one uses. Run it with `flask audit-indexes`.
+"""
+import click
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from . import db
+
+def _add_missing_columns(conn, table, existing_columns):
+    for column in table.columns:
+        if column.name in existing_columns:
+            continue
+        if column.primary_key or column.unique:
+            print(f"Cannot add constrained column {table.name}.{column.name} in place; skipping")
+            continue
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+        print(f"Added column {table.name}.{column.name}")
+
+
+def _add_missing_indexes(conn, table, existing_indexes):
+    for index in table.indexes:
+        if index.name in existing_indexes:
+            continue
+        try:
+            with conn.begin_nested():
+                index.create(bind=conn)
+            print(f"Created index {index.name}")
+        except (IntegrityError, OperationalError) as e:
+            # A unique index over rows that already contain duplicates
+            print(f"Could not create index {index.name}: {e.orig}")
+
+
+def upgrade_database():
+    """Add columns and indexes defined on the models but missing from the database."""
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        existing_tables = set(inspector.get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {c['name'] for c in inspector.get_columns(table.name)}
+            existing_indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+            _add_missing_columns(conn, table, existing_columns)
+            _add_missing_indexes(conn, table, existing_indexes)
+
+
+def _hot_queries():
+    from .models import ScraperResult, SavedSearch, ScraperSchedule, PriceObservation, PriceDailyRollup
+
+    return {
+        'home deals': ScraperResult.query.filter_by(user_id=1).order_by(ScraperResult.id.desc()),
+        'deal count': db.session.query(db.func.count(ScraperResult.id)).filter_by(user_id=1),
+        'deal dedup lookup': db.session.query(ScraperResult.dedup_key).filter(
+            ScraperResult.dedup_key.in_(['0' * 40, 'f' * 40])
+        ),
+        'recent deals': ScraperResult.query.filter(
+            ScraperResult.user_id == 1, ScraperResult.date_created >= '2024-01-01'
+        ),
+        'latest saved search': SavedSearch.query.filter_by(user_id=1).order_by(SavedSearch.date_created.desc()),
+        'scheduled searches': SavedSearch.query.filter(SavedSearch.schedule_type == 'daily'),
+        'due saved searches': SavedSearch.query.filter(
+            SavedSearch.next_run_at <= '2024-01-01'
+        ).order_by(SavedSearch.next_run_at),
+        'due schedules': ScraperSchedule.query.filter(
+            ScraperSchedule.active.is_(True), ScraperSchedule.next_run <= '2024-01-01'
+        ),
+        'price observations': PriceObservation.query.filter(
+            PriceObservation.product_id == 1, PriceObservation.ts >= '2024-01-01'
+        ),
+        'price history': PriceDailyRollup.query.filter(
+            PriceDailyRollup.product_id.in_([1, 2]), PriceDailyRollup.day >= '2024-01-01'
+        ),
+    }
+
+
+def audit_query_plans():
+    """Return {query name: [plan detail, ...]} for the hot queries (SQLite only)."""
+    plans = {}
+    for name, query in _hot_queries().items():
+        sql = str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+        rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+        plans[name] = [row[-1] for row in rows]
+    return plans
+
+
+def full_scans(plans):
+    return {
+        name: detail
+        for name, details in plans.items()
+        for detail in details
+        if detail.startswith('SCAN') and 'USING' not in detail
+    }
+
+
+def init_app(app):
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """Add missing columns and indexes to an existing database."""
+        upgrade_database()
+
+    @app.cli.command('compact-deals')
+    def compact_deals_command():
+        """Remove duplicate deals and backfill their idempotency keys."""
+        from .deals import compact_duplicate_deals
+        keyed, deleted = compact_duplicate_deals()
+        click.echo(f"Deleted {deleted} duplicate deals, keyed {keyed} rows")
+        upgrade_database()
+
+    @app.cli.command('audit-indexes')
+    def audit_indexes_command():
+        """Show the query plan of each hot query; exit non-zero on a full table scan."""
+        if db.engine.dialect.name != 'sqlite':
+            raise click.ClickException('EXPLAIN QUERY PLAN audit is only available on SQLite')
+        plans = audit_query_plans()
+        for name, details in plans.items():
+            click.echo(f"{name}:")
+            for detail in details:
+                click.echo(f"    {detail}")
+        scans = full_scans(plans)
+        if scans:
+            raise click.ClickException(f"Full table scans: {', '.join(sorted(scans))}")
@@ -5,11 +5,15 @@ The `Note` model represents a note that is associated with a user. It has an `id
 
 The `User` model represents a user of the application. It has an `id`, `email`, `password`, `first_name`, and `notes` field.
 
-The `ScraperResult` model represents the result of a web scraping operation. It has an `id`, `data`, `date_created`, `store`, `price`, `user_id`, `product`, `target_price`, `city`, `country`, `email_notification`, and `user` field.
+The `ScraperResult` model represents the result of a web scraping operation. It has an `id`, `data`, `date_created`, `store`, `price`, `user_id`, `product`, `target_price`, `city`, `country`, `email_notification`, `user`, and `dedup_key` field.
 
 The `ScraperSchedule` model represents a scheduled web scraping operation. It has an `id`, `user_id`, `interval`, `active`, `last_run`, `next_run`, `product`, `target_price`, `city`, `country`, `email_notification`, and `user` field.
 
-The `SavedSearch` model represents a saved search that a user has created. It has an `id`, `user_id`, `product`, `target_price`, `city`, `country`, `email_notification`, `date_created`, `user`, `schedule_type`, `schedule_time`, and `schedule_days` field.
+The `SavedSearch` model represents a saved search that a user has created. It has an `id`, `user_id`, `product`, `target_price`, `city`, `country`, `email_notification`, `date_created`, `user`, `schedule_type`, `schedule_time`, `schedule_days`, `last_run`, and `next_run_at` field.
+
+The `PriceProduct` and `PriceStore` models intern product and store names for the price history. `PriceObservation` stores one observed offer price (in integer cents) per product, store and time, and `PriceDailyRollup` keeps the daily min/max/sum/count per product and store.
+
+The `GeocodeCache` model persists Nominatim lookups keyed by the normalized location string. It has a `key`, `latitude`, `longitude`, `address`, `found`, and `updated_at` field.
 """
 from . import db
 from flask_login import UserMixin
@@ -53,6 +57,14 @@ class ScraperResult(db.Model):
     email_notification = db.Column(db.Boolean, default=True)
     user = db.relationship('User')
     timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    dedup_key = db.Column(db.String(40))  # idempotency key, see deals.deal_dedup_key
+
+    __table_args__ = (
+        # One row per deal per search; also backs the bulk lookup in deals.save_deals
+        db.Index('uq_scraper_result_dedup_key', 'dedup_key', unique=True),
+        # Serves the per-user listing, polling and counts (ordered by id) and the export's date filter
+        db.Index('ix_scraper_result_user_id_id', 'user_id', 'id'),
+    )
 
 class ScraperSchedule(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -69,6 +81,11 @@ class ScraperSchedule(db.Model):
     email_notification = db.Column(db.Boolean, default=True)
     user = db.relationship('User')
 
+    __table_args__ = (
+        db.Index('ix_scraper_schedule_user_id', 'user_id'),
+        db.Index('ix_scraper_schedule_active_next_run', 'active', 'next_run'),
+    )
+
 class SavedSearch(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     duration = db.Column(db.Integer)  # Duration in minutes
@@ -84,7 +101,52 @@ class SavedSearch(db.Model):
     schedule_time = db.Column(db.Time)
     schedule_days = db.Column(db.String(100))  # Store as comma-separated days
     interval_value = db.Column(db.Integer)
-    interval_unit = db.Column(db.String(10))  # 'minutes' or 'hours'    last_run = db.Column(db.DateTime)
-   
+    interval_unit = db.Column(db.String(10))  # 'minutes' or 'hours'
+    last_run = db.Column(db.DateTime)
+    next_run_at = db.Column(db.DateTime)  # None when not scheduled; see search_scheduler.compute_next_run
+
+    __table_args__ = (
+        db.Index('ix_saved_search_user_created', 'user_id', 'date_created'),
+        db.Index('ix_saved_search_schedule_type', 'schedule_type'),
+        db.Index('ix_saved_search_next_run_at', 'next_run_at'),
+    )
+
+class GeocodeCache(db.Model):
+    key = db.Column(db.String(300), primary_key=True)  # normalized "city,country"
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    address = db.Column(db.String(500))
+    found = db.Column(db.Boolean, default=True)  # False caches a failed lookup
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+class PriceProduct(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), unique=True, nullable=False)  # normalized offer title
+
+class PriceStore(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+
+class PriceObservation(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('price_product.id'), nullable=False)
+    store_id = db.Column(db.Integer, db.ForeignKey('price_store.id'), nullable=False)
+    ts = db.Column(db.DateTime, nullable=False)
+    price_cents = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_price_observation_product_ts', 'product_id', 'ts'),
+    )
 
+class PriceDailyRollup(db.Model):
+    product_id = db.Column(db.Integer, db.ForeignKey('price_product.id'), primary_key=True)
+    store_id = db.Column(db.Integer, db.ForeignKey('price_store.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    min_cents = db.Column(db.Integer, nullable=False)
+    max_cents = db.Column(db.Integer, nullable=False)
+    sum_cents = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_price_daily_rollup_product_day', 'product_id', 'day'),
+    )
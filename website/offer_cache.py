@@ -0,0 +1,76 @@
+"""
+Time-windowed caches of raw (unfiltered) offers.
+
+Offers are cached before any target-price filtering, so every user searching the
+same product in the same place within the window is served from one fetch and
+only their own `target_price` is applied on top.
+
+Usage:
+    offers = scrape_cache.get(key)
+    if offers is None:
+        offers = scrape(...)
+        scrape_cache.put(key, offers)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+SHARED_SCRAPE_WINDOW = int(os.getenv("SHARED_SCRAPE_WINDOW", 15 * 60))  # seconds
+SHARED_SCRAPE_CACHE_SIZE = int(os.getenv("SHARED_SCRAPE_CACHE_SIZE", 256))
+API_OFFER_CACHE_TTL = int(os.getenv("API_OFFER_CACHE_TTL", 5 * 60))  # seconds
+API_OFFER_CACHE_SIZE = int(os.getenv("API_OFFER_CACHE_SIZE", 512))
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after they were stored."""
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def location_key(product, latitude, longitude):
+    # ~100m grid, so nearby geocodes of the same city share entries
+    return (' '.join(product.split()).lower(), round(latitude, 3), round(longitude, 3))
+
+
+# meinprospekt offers per (product, location), shared across users by the scraper
+scrape_cache = TTLCache(SHARED_SCRAPE_WINDOW, SHARED_SCRAPE_CACHE_SIZE)
+
+# Retailer API offers per (retailer, product, location), used by api_searcher
+retailer_cache = TTLCache(API_OFFER_CACHE_TTL, API_OFFER_CACHE_SIZE)
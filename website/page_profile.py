@@ -0,0 +1,127 @@
+"""
+Request-interception profiles for scraper pages.
+
+A profile decides which requests a page may make: whole resource types (images,
+fonts, ...) can be blocked, and so can passive resources (images, styles, pixels)
+from hosts outside `allowed_domains`. Scripts, XHR/fetch and documents are allowed
+from any host, since the offer grid may be rendered by code or APIs served from
+hosts other than meinprospekt's own. `install_profile` routes the page through
+the profile and counts requests, blocked requests and response bytes into a
+`TrafficCounter`, so savings can be compared between profiles (SCRAPER_PAGE_PROFILE).
+
+Profiles:
+    full:    nothing blocked (what a normal browser loads)
+    lean:    no images, media or fonts; no third-party passive resources (default)
+    minimal: lean, and no stylesheets either
+
+Usage:
+    traffic = TrafficCounter()
+    install_profile(page, PROFILES['lean'], traffic)
+    page.goto(url, wait_until='commit')
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+SCRAPER_PAGE_PROFILE = os.getenv("SCRAPER_PAGE_PROFILE", "lean")
+SCRAPER_ALLOWED_DOMAINS = tuple(
+    domain.strip() for domain in os.getenv("SCRAPER_ALLOWED_DOMAINS", "meinprospekt.de").split(',') if domain.strip()
+)
+# Resource types block_third_party drops from other hosts; the page never needs them to render offers
+PASSIVE_RESOURCE_TYPES = frozenset({'image', 'media', 'font', 'stylesheet', 'texttrack', 'manifest'})
+
+
+@dataclass(frozen=True)
+class PageProfile:
+    name: str
+    blocked_resource_types: frozenset = frozenset()
+    block_third_party: bool = False
+    allowed_domains: tuple = SCRAPER_ALLOWED_DOMAINS
+
+    def is_first_party(self, url):
+        host = urlsplit(url).hostname or ''
+        return any(host == domain or host.endswith('.' + domain) for domain in self.allowed_domains)
+
+    def allows(self, resource_type, url):
+        if resource_type in self.blocked_resource_types:
+            return False
+        if (self.block_third_party and resource_type in PASSIVE_RESOURCE_TYPES
+                and not url.startswith('data:') and not self.is_first_party(url)):
+            return False
+        return True
+
+
+PROFILES = {
+    'full': PageProfile('full'),
+    'lean': PageProfile('lean', frozenset({'image', 'media', 'font'}), block_third_party=True),
+    'minimal': PageProfile('minimal', frozenset({'image', 'media', 'font', 'stylesheet'}), block_third_party=True),
+}
+
+
+class TrafficCounter:
+    """Requests, blocked requests and response bytes of one scraper run (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.stats = {
+            'requests': 0,
+            'blocked': 0,
+            'responses': 0,
+            'bytes': 0,
+        }
+
+    def add(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['seconds'] = round(time.monotonic() - self.started, 3)
+        return stats
+
+
+# Totals over every run since start
+traffic_totals = TrafficCounter()
+
+
+def get_profile(name=None):
+    name = name or SCRAPER_PAGE_PROFILE
+    if name not in PROFILES:
+        print(f"Unknown page profile {name!r}; using 'full'")
+        return PROFILES['full']
+    return PROFILES[name]
+
+
+def install_profile(page, profile, traffic=None):
+    """Route every request of `page` through `profile`, counting into `traffic`."""
+    counters = [traffic_totals] + ([traffic] if traffic is not None else [])
+
+    def count(stat, amount=1):
+        for counter in counters:
+            counter.add(stat, amount)
+
+    def handle_route(route):
+        request = route.request
+        count('requests')
+        if profile.allows(request.resource_type, request.url):
+            route.continue_()
+        else:
+            count('blocked')
+            route.abort()
+
+    def handle_response(response):
+        count('responses')
+        # Content-Length is free to read; chunked responses without it are not counted
+        length = response.headers.get('content-length')
+        if length and length.isdigit():
+            count('bytes', int(length))
+
+    if profile.blocked_resource_types or profile.block_third_party:
+        page.route('**/*', handle_route)
+    else:
+        page.on('request', lambda request: count('requests'))
+    page.on('response', handle_response)
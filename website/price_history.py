@@ -0,0 +1,166 @@
+"""
+Compact price history of every offer the scraper and retailer APIs return.
+
+Each freshly fetched offer becomes one `PriceObservation` row (interned product and
+store ids, timestamp, price in integer cents), and the matching `PriceDailyRollup`
+row is updated in the same transaction, so trend questions ("lowest butter price
+per store over the last 30 days") read a handful of rollup rows instead of scanning
+ScraperResult.
+
+Usage:
+    record_offers(offers)            # objects with store, price, product_name
+    history = price_history('butter', days=30)
+"""
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from website.models import PriceProduct, PriceStore, PriceObservation, PriceDailyRollup, db
+
+LOOKUP_CHUNK_SIZE = 300
+INTERN_ATTEMPTS = 3  # lookup/insert rounds before giving up on concurrent inserts
+
+_ids_lock = threading.Lock()
+_interned = {PriceProduct: {}, PriceStore: {}}  # model -> {name: id}
+
+
+def normalize_name(name):
+    return ' '.join((name or '').split()).lower()
+
+
+def to_cents(price):
+    return int(round(float(price) * 100))
+
+
+def _intern(model, names):
+    """Return {name: id} for `names`, inserting names not stored yet."""
+    with _ids_lock:
+        known = {name: _interned[model][name] for name in names if name in _interned[model]}
+    missing = [name for name in names if name not in known]
+
+    for attempt in range(INTERN_ATTEMPTS):
+        for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            chunk = missing[start:start + LOOKUP_CHUNK_SIZE]
+            known.update(db.session.query(model.name, model.id).filter(model.name.in_(chunk)).all())
+        missing = [name for name in missing if name not in known]
+        if not missing:
+            break
+        rows = [model(name=name) for name in missing]
+        try:
+            with db.session.begin_nested():
+                db.session.add_all(rows)
+        except IntegrityError:
+            continue  # another worker interned some of them first; look them up again
+        # The savepoint flushed the rows, so their ids are assigned
+        known.update((row.name, row.id) for row in rows)
+        missing = []
+        break
+    if missing:
+        raise SQLAlchemyError(f"Could not intern {len(missing)} {model.__tablename__} names")
+
+    with _ids_lock:
+        _interned[model].update(known)
+    return known
+
+
+def _update_rollups(observations):
+    groups = defaultdict(list)
+    for product_id, store_id, ts, cents in observations:
+        groups[(product_id, store_id, ts.date())].append(cents)
+
+    keys = list(groups)
+    existing = {}
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+        for rollup in PriceDailyRollup.query.filter(
+            tuple_(PriceDailyRollup.product_id, PriceDailyRollup.store_id, PriceDailyRollup.day).in_(chunk)
+        ):
+            existing[(rollup.product_id, rollup.store_id, rollup.day)] = rollup
+
+    for key, prices in groups.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            db.session.add(PriceDailyRollup(
+                product_id=key[0], store_id=key[1], day=key[2],
+                min_cents=min(prices), max_cents=max(prices),
+                sum_cents=sum(prices), count=len(prices)
+            ))
+        else:
+            rollup.min_cents = min(rollup.min_cents, min(prices))
+            rollup.max_cents = max(rollup.max_cents, max(prices))
+            rollup.sum_cents += sum(prices)
+            rollup.count += len(prices)
+
+
+def record_offers(offers, ts=None):
+    """Store one observation per offer and fold it into the daily rollups.
+
+    Failures are logged and rolled back; the price history never breaks a search.
+    """
+    offers = [offer for offer in offers if offer.price is not None and offer.store]
+    if not offers:
+        return
+    ts = ts or datetime.now()
+    try:
+        product_ids = _intern(PriceProduct, list({normalize_name(o.product_name) for o in offers}))
+        store_ids = _intern(PriceStore, list({o.store.strip() for o in offers}))
+        observations = [
+            (product_ids[normalize_name(o.product_name)], store_ids[o.store.strip()], ts, to_cents(o.price))
+            for o in offers
+        ]
+        db.session.execute(PriceObservation.__table__.insert(), [
+            {'product_id': product_id, 'store_id': store_id, 'ts': observed_at, 'price_cents': cents}
+            for product_id, store_id, observed_at, cents in observations
+        ])
+        _update_rollups(observations)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Could not record price history: {e}")
+
+
+def price_history(product, days=30):
+    """Daily min/avg/max per store for products whose name contains `product`."""
+    needle = normalize_name(product)
+    since = (datetime.now() - timedelta(days=days)).date()
+    rows = db.session.query(
+        PriceStore.name,
+        PriceDailyRollup.day,
+        db.func.min(PriceDailyRollup.min_cents),
+        db.func.max(PriceDailyRollup.max_cents),
+        db.func.sum(PriceDailyRollup.sum_cents),
+        db.func.sum(PriceDailyRollup.count)
+    ).join(
+        PriceProduct, PriceProduct.id == PriceDailyRollup.product_id
+    ).join(
+        PriceStore, PriceStore.id == PriceDailyRollup.store_id
+    ).filter(
+        PriceProduct.name.contains(needle),
+        PriceDailyRollup.day >= since
+    ).group_by(
+        PriceStore.name, PriceDailyRollup.day
+    ).order_by(
+        PriceStore.name, PriceDailyRollup.day
+    ).all()
+
+    stores = defaultdict(list)
+    for store, day, min_cents, max_cents, sum_cents, count in rows:
+        stores[store].append({
+            'day': day.isoformat(),
+            'min': min_cents / 100,
+            'avg': round(sum_cents / count / 100, 2),
+            'max': max_cents / 100,
+            'count': count
+        })
+    return {
+        'product': product,
+        'days': days,
+        'stores': {
+            store: {
+                'lowest': min(entry['min'] for entry in entries),
+                'daily': entries
+            }
+            for store, entries in stores.items()
+        }
+    }
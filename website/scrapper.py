@@ -1,6 +1,16 @@
 """
 Runs a web scraper to search for products on the meinprospekt.de website and logs any deals found.
 
+`run_scraper` handles a single search. `run_scraper_batch` takes many searches for the
+same location, geocodes once, scrapes each distinct product once (optionally on several
+pages concurrently) and fans the offers back out per search/user. Raw offers are kept
+in `scrape_cache` for SHARED_SCRAPE_WINDOW seconds, so other users searching the same
+product nearby within that window are served without scraping again. Each product's
+offers are matched against all of its searches' target prices at once (matching.py).
+Pages load through a request-blocking profile (page_profile.py, SCRAPER_PAGE_PROFILE).
+With SCRAPER_BACKEND=auto (default) each product is first fetched over plain HTTP
+(http_scraper.py) and only products with no offers found there open a browser page.
+
 Args:
     city (str): The city to search for products in.
     country (str): The country to search for products in.
@@ -10,209 +20,351 @@ Args:
     user_id (int, optional): The ID of the user who requested the scraping.
 
 Returns:
-    list: A list of strings representing the output of the scraping process.
+    list: A list of formatted deal results.
 """
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 import os
-from geopy.geocoders import Nominatim
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from contextvars import copy_context
 from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from dotenv import load_dotenv
-from dataclasses import dataclass
-from website.models import ScraperResult, db
+from dataclasses import dataclass, field
+from website.geocoding import geocode_city
+from website.browser_pool import browser_pool
+from website.email_service import send_email, user_email
+from website.deals import save_deals
+from website.offer_cache import scrape_cache, location_key
+from website.price_history import record_offers
+from website.matching import OfferMatrix
+from website.page_profile import TrafficCounter, get_profile, install_profile
+from website.http_scraper import fetch_offer_records, SEARCH_URL
+from website.metrics import count, run_record, timed
+from website.job_queue import JobTimeout, check_deadline, remaining_time
 
-geolocator = Nominatim(user_agent="FindmyPrize_Flask")
+SCRAPER_BATCH_CONCURRENCY = int(os.getenv("SCRAPER_BATCH_CONCURRENCY", 2))
+SCRAPER_EXTRACTION = os.getenv("SCRAPER_EXTRACTION", "batch")  # 'batch' or 'elements'
+OFFER_CARD_SELECTOR = ".card.card--offer.slider-preventClick"
+SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "auto")  # 'auto', 'http' or 'browser'
+SCRAPER_PAGE_TIMEOUT = float(os.getenv("SCRAPER_PAGE_TIMEOUT", 10))  # seconds per navigation/selector wait
 
-def run_scraper(city, country, product, target_price, should_send_email, user_id=None):
-    loc = geolocator.geocode(f"{city},{country}")
-    my_long = loc.longitude
-    my_lat = loc.latitude
-
-    load_dotenv()
-    EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
-    EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
-    RECIPIENT_EMAIL = os.getenv("RECIPIENT_EMAIL")
-
-    def send_email(subject, message, should_send_email):
-        
-        if should_send_email:
-            sender_email = EMAIL_ADDRESS
-            sender_password = EMAIL_PASSWORD
-            receiver_email = RECIPIENT_EMAIL
-
-            msg = MIMEMultipart()
-            msg["From"] = sender_email
-            msg["To"] = receiver_email
-            msg["Subject"] = subject
-            msg.attach(MIMEText(message, "plain"))
-
-            server = smtplib.SMTP("smtp.gmail.com", 587)
-            server.starttls()
-            server.login(sender_email, sender_password)
-            text = msg.as_string()
-            server.sendmail(sender_email, receiver_email, text)
-            server.quit()
-
-    class DealFinding:
-        def __init__(self, store, price, product_name, original_price=None, discount=None):
-            self.store = store
-            self.price = price
-            self.product_name = product_name
-            self.original_price = original_price
-            self.discount = discount
-            self.timestamp = datetime.now()
-
-    collected_findings = []
-
-    def format_email_content(findings):
-        email_content = f"""
+# Long-lived so its threads (and the browsers they own in the pool) are reused across batches;
+# all browser work runs here, so SCRAPER_POOL_SIZE threads own the pool's browsers
+_page_workers = ThreadPoolExecutor(max_workers=browser_pool.size, thread_name_prefix='scraper-page')
+
+# Products served by the HTTP fast path vs. handed to the browser in 'auto' mode
+backend_stats = {
+    'http_served': 0,
+    'browser_fallbacks': 0,
+}
+
+
+@dataclass
+class DealFinding:
+    store: str
+    price: float
+    product_name: str
+    original_price: float = None
+    discount: float = None
+    timestamp: datetime = field(default_factory=datetime.now)
+    price_text: str = None
+
+
+@dataclass
+class Offer:
+    store: str
+    price: float
+    price_text: str
+    product_name: str
+
+
+@dataclass
+class BatchSearch:
+    product: str
+    target_price: float
+    user_id: int = None
+    should_send_email: bool = False
+
+
+# One round trip for every card on the page instead of several per card
+_EXTRACT_CARDS_JS = """
+cards => cards.map(card => {
+    const text = selector => {
+        const element = card.querySelector(selector);
+        return element ? element.innerText.trim() : null;
+    };
+    return {
+        store: text('.card__subtitle'),
+        price: text('.card__prices-main-price'),
+        title: text('.card__title'),
+    };
+})
+"""
+
+
+def _parse_price(price_text):
+    try:
+        return float(price_text.replace("€", "").replace(",", ".").strip())
+    except ValueError:
+        print(f"Could not convert price to float: {price_text}")
+        return None
+
+
+def _offer_from_fields(store, price_text, title):
+    if not store or not price_text:
+        return None
+    price_value = _parse_price(price_text)
+    if price_value is None:
+        return None
+    return Offer(store, price_value, price_text, title or "Unknown Product")
+
+
+def _offers_from_records(records):
+    offers = (_offer_from_fields(r['store'], r['price'], r['title']) for r in records)
+    return [offer for offer in offers if offer is not None]
+
+
+def _extract_offers_batch(offer_section):
+    return _offers_from_records(offer_section.eval_on_selector_all(OFFER_CARD_SELECTOR, _EXTRACT_CARDS_JS))
+
+
+def _extract_offers_elements(offer_section):
+    offers = []
+    for product_element in offer_section.query_selector_all(OFFER_CARD_SELECTOR):
+        store_element = product_element.query_selector(".card__subtitle")
+        price_element = product_element.query_selector(".card__prices-main-price")
+        if not (store_element and price_element):
+            continue
+        title_element = product_element.query_selector(".card__title")
+        offer = _offer_from_fields(
+            store_element.inner_text().strip(),
+            price_element.inner_text().strip(),
+            title_element.inner_text().strip() if title_element else None
+        )
+        if offer is not None:
+            offers.append(offer)
+    return offers
+
+
+def _page_timeout_ms():
+    # Never wait past the running job's deadline; Playwright treats 0 as "no timeout"
+    seconds = min(SCRAPER_PAGE_TIMEOUT, remaining_time(SCRAPER_PAGE_TIMEOUT))
+    return max(int(seconds * 1000), 1)
+
+
+def scrape_offers(page, product, lat, lng, extraction=None):
+    """Return every offer meinprospekt lists for `product` around (lat, lng), unfiltered.
+
+    `extraction` is 'batch' (all cards read in one evaluate call) or 'elements' (one
+    query per field per card); defaults to SCRAPER_EXTRACTION.
+    Returns None when the page timed out, so the failure is not cached as "no offers".
+    """
+    url = f"{SEARCH_URL}?query={product}&lat={lat}&lng={lng}"
+    extraction = extraction or SCRAPER_EXTRACTION
+    try:
+        with timed('navigation'):
+            # The offer grid is rendered client-side; waiting for it is all that matters,
+            # not for the page's `load` event (images, trackers, ads)
+            page.goto(url, wait_until="commit", timeout=_page_timeout_ms())
+            offer_section = page.wait_for_selector(
+                ".search-group-grid-content", timeout=_page_timeout_ms()
+            )
+        if not offer_section:
+            print(f"No Product {product} found")
+            return []
+        with timed('extraction'):
+            if extraction == 'elements':
+                return _extract_offers_elements(offer_section)
+            return _extract_offers_batch(offer_section)
+    except PlaywrightTimeoutError:
+        count('scrape_errors_total', backend='browser', reason='timeout')
+        print(f"Timeout exceeded for {product}. Moving to the next item.")
+        return None
+
+
+def _scrape_products(products, lat, lng, concurrency, traffic=None):
+    """Return {product: [Offer, ...]}, scraping only products not seen here within the shared window."""
+    offers_by_product = {}
+    missing = []
+    for product in products:
+        offers = scrape_cache.get(location_key(product, lat, lng))
+        if offers is None:
+            missing.append(product)
+        else:
+            offers_by_product[product] = offers
+    count('scrape_cache_hits_total', len(products) - len(missing))
+
+    if missing:
+        fresh = []
+        for product, offers in _scrape_uncached(missing, lat, lng, concurrency, traffic).items():
+            if offers is not None:
+                scrape_cache.put(location_key(product, lat, lng), offers)
+                fresh.extend(offers)
+            offers_by_product[product] = offers or []
+        count('offers_seen_total', len(fresh), source='meinprospekt')
+        with timed('price_history'):
+            record_offers(fresh)  # only fresh scrapes; cache hits were recorded when fetched
+    return offers_by_product
+
+
+def scrape_offers_http(product, lat, lng):
+    """Like `scrape_offers`, over plain HTTP (http_scraper.py); None if the request failed."""
+    records = fetch_offer_records(product, lat, lng)
+    if records is None:
+        count('scrape_errors_total', backend='http', reason='request')
+        return None
+    return _offers_from_records(records)
+
+
+def _scrape_uncached(products, lat, lng, concurrency, traffic=None, backend=None):
+    """Scrape with SCRAPER_BACKEND: 'http' only, 'browser' only, or 'auto' (HTTP, then the
+    browser for products the HTTP fast path found no offers for)."""
+    backend = backend or SCRAPER_BACKEND
+    if backend == 'browser':
+        return _scrape_browser(products, lat, lng, concurrency, traffic)
+
+    results = {}
+    for product in products:
+        check_deadline()
+        results[product] = scrape_offers_http(product, lat, lng)
+    if backend == 'http':
+        return results
+    fallback = [product for product, offers in results.items() if not offers]
+    backend_stats['http_served'] += len(products) - len(fallback)
+    backend_stats['browser_fallbacks'] += len(fallback)
+    if fallback:
+        results.update(_scrape_browser(fallback, lat, lng, concurrency, traffic))
+    return results
+
+
+def _scrape_browser(products, lat, lng, concurrency, traffic=None):
+    profile = get_profile()
+
+    def scrape_on_page(batch):
+        check_deadline()
+        with browser_pool.page() as page:
+            install_profile(page, profile, traffic)
+            results = {}
+            for product in batch:
+                check_deadline()
+                results[product] = scrape_offers(page, product, lat, lng)
+            return results
+
+    # Every page is borrowed on a `_page_workers` thread, even for one product, so the
+    # browsers stay with that fixed set of threads instead of whichever worker called.
+    # copy_context() so the page threads see the job deadline and count towards the caller's run record
+    if concurrency <= 1 or len(products) <= 1:
+        batches = [products]
+    else:
+        batches = [[product] for product in products]
+    futures = [_page_workers.submit(copy_context().run, scrape_on_page, batch) for batch in batches]
+    results = {}
+    for future in futures:
+        try:
+            results.update(future.result(timeout=remaining_time()))
+        except FuturesTimeoutError:
+            raise JobTimeout()
+    return results
+
+
+def format_email_content(findings, product, city, country, target_price):
+    email_content = f"""
         🎯 Deal Alert Summary for {product}
         📍 Location: {city}, {country}
         💰 Target Price: €{target_price:.2f}
-        
+
         Found Deals:
         """
-        for finding in findings:
-            email_content += f"""
+    for finding in findings:
+        email_content += f"""
             🏪 {finding.store}
             📦 {finding.product_name}
             💶 Current Price: €{finding.price:.2f}
             ⏰ Found at: {finding.timestamp.strftime('%Y-%m-%d %H:%M:%S')}
             {'=' * 50}
             """
-        return email_content
-
-    def log_deal(store, price, product_name, data):
-        # Check if this exact deal already exists in collected_findings
-        for finding in collected_findings:
-            if (finding.store == store and 
-                finding.price == price and 
-                finding.product_name == product_name):
-                return  # Skip if duplicate
-            
-        # If not duplicate, add to collected_findings
-        finding = DealFinding(store, price, product_name)
-        collected_findings.append(finding)
-    
-        # Check if result already exists in database
-        existing_result = ScraperResult.query.filter_by(
-            store=store,
-            price=price,
-            product=product_name,
-            target_price=target_price,
-            city=city,
-            country=country,
-            user_id=user_id
-        ).first()
-    
-        if not existing_result:
-            scraper_result = ScraperResult(
-                store=store,
-                price=price,
-                product=product_name,
-                target_price=target_price,
-                city=city,
-                country=country,
-                email_notification=should_send_email,
-                user_id=user_id,
-                data=data,
-                timestamp=finding.timestamp
-            )
-            db.session.add(scraper_result)
-            db.session.commit()
+    return email_content
 
-    @dataclass
-    class Product:
-        name: str
-        target_price: float
 
-    PRODUCTS_AND_PRICES = [
-        Product(product, float(target_price))
+def _collect_deals(search, matched_offers, city, country):
+    product = search.product
+    target_price = float(search.target_price)
+    user_id = search.user_id
+    deals = [
+        DealFinding(offer.store, offer.price, offer.product_name, price_text=offer.price_text)
+        for offer in matched_offers
     ]
-    
-    results = []
-
-    with sync_playwright() as p:
-        browser = browser = p.chromium.launch(
-                    headless=True,
-                    chromium_sandbox=False,
-                    args=[
-                        '--no-sandbox',
-                       '--disable-setuid-sandbox',
-                       '--disable-dev-shm-usage'
-                             ]
-)
-
-
-        page = browser.new_page()
-
-        for item in PRODUCTS_AND_PRICES:
-            product = item.name
-            target_price = item.target_price
-            url = f"https://www.meinprospekt.de/webapp/?query={product}&lat={my_lat}&lng={my_long}"
-
-            try:
-                page.goto(url)
-                page.wait_for_load_state("load", timeout=10000)
-                offer_section = page.wait_for_selector(
-                    ".search-group-grid-content", timeout=10000
-                )
-                if not offer_section:
-                    output = f"No Product {product} found"
-                else:
-                    products = offer_section.query_selector_all(
-                        ".card.card--offer.slider-preventClick"
-                    )
-                    output = ""
-                    for product_element in products:
-                        store_element = product_element.query_selector(".card__subtitle")
-                        price_element = product_element.query_selector(
-                            ".card__prices-main-price"
-                        )
-                        if store_element and price_element:
-                            store = store_element.inner_text().strip()
-                            price_text = price_element.inner_text().strip()
-                            try:
-                                price_value = float(
-                                    price_text.replace("€", "").replace(",", ".").strip()
-                                )
-                                if price_value <= target_price:
-                                    product_name_element = product_element.query_selector(
-                                        ".card__title"
-                                    )
-                                    product_name = product_name_element.inner_text().strip() if product_name_element else "Unknown Product"
-
-                                    message = f"Deal alert! {store} offers {product_name} for {price_text}! (Target price: €{target_price:.2f})"
-                                    log_deal(store, price_value, product_name, message)
-                                    output += message + "\n"
-                            except ValueError:
-                                print(f"Could not convert price to float: {price_text}")
-            except PlaywrightTimeoutError:
-                print(f"Timeout exceeded for {product}. Moving to the next item.")
-                continue
-
-            print(output)
-            results.append(output)
-        browser.close()
+    collected_findings = save_deals(
+        deals,
+        target_price=target_price,
+        city=city,
+        country=country,
+        user_id=user_id,
+        email_notification=search.should_send_email,
+        describe=lambda finding: f"Deal alert! {finding.store} offers {finding.product_name} for {finding.price_text}! (Target price: €{target_price:.2f})"
+    )
 
     # After collecting all findings, send one consolidated email
-    if collected_findings and should_send_email:
-        email_content = format_email_content(collected_findings)
+    if collected_findings and search.should_send_email:
+        email_content = format_email_content(collected_findings, product, city, country, target_price)
         subject = f"Deal Alert Summary - {len(collected_findings)} deals found for {product}!"
-        send_email(subject, email_content, should_send_email)
+        send_email(subject, email_content, search.should_send_email, recipient=user_email(user_id))
 
     # Format results for web display
-    formatted_results = []
-    for finding in collected_findings:
-        formatted_deal = {
+    return [
+        {
             'store': finding.store,
             'product_name': finding.product_name,
             'price': finding.price,
             'timestamp': finding.timestamp,
             'target_price': target_price
         }
-        formatted_results.append(formatted_deal)
+        for finding in collected_findings
+    ]
+
+
+def run_scraper_batch(city, country, searches, concurrency=SCRAPER_BATCH_CONCURRENCY):
+    """Run many searches for one location in a single scraping session.
+
+    `searches` is a list of `BatchSearch` (or (product, target_price, user_id) tuples).
+    Returns a list of formatted results, one entry per search, in input order.
+    """
+    searches = [s if isinstance(s, BatchSearch) else BatchSearch(*s) for s in searches]
+    if not searches:
+        return []
+    with run_record('scraper', city=city, country=country, searches=len(searches)) as run:
+        return _run_scraper_batch(city, country, searches, concurrency, run)
+
 
-    return formatted_results   
\ No newline at end of file
+def _run_scraper_batch(city, country, searches, concurrency, run):
+    with timed('geocode'):
+        loc = geocode_city(city, country)
+    if loc is None:
+        count('geocode_failures_total')
+        print(f"Could not geocode {city}, {country}")
+        return [[] for _ in searches]
+
+    products = list(dict.fromkeys(search.product for search in searches))
+    traffic = TrafficCounter()
+    offers_by_product = _scrape_products(products, loc.latitude, loc.longitude, concurrency, traffic)
+    run['products'] = len(products)
+    run['traffic'] = traffic.snapshot()
+
+    # Every target price for a product is matched against its offers in one pass
+    matched = [None] * len(searches)
+    with timed('matching'):
+        for product in products:
+            indexes = [i for i, search in enumerate(searches) if search.product == product]
+            matrix = OfferMatrix(offers_by_product.get(product, []))
+            ranked = matrix.match([float(searches[i].target_price) for i in indexes])
+            for i, offers in zip(indexes, ranked):
+                matched[i] = offers
+
+    results = []
+    for search, offers in zip(searches, matched):
+        check_deadline()
+        results.append(_collect_deals(search, offers, city, country))
+    return results
+
+
+def run_scraper(city, country, product, target_price, should_send_email, user_id=None):
+    search = BatchSearch(product, float(target_price), user_id, should_send_email)
+    return run_scraper_batch(city, country, [search])[0]
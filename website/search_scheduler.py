@@ -0,0 +1,172 @@
+"""
+Runs saved searches when they are due.
+
+Every SavedSearch with a schedule carries a persisted `next_run_at`. The minute
+tick only loads rows whose `next_run_at` has passed (an indexed range query),
+hands them to the search workers (job_queue.py) coalesced by (city, country), so
+one job scrapes every due product of a location in one batch, and each run stores
+the next run time computed from the schedule, so the tick cost follows the amount
+of due work rather than the total number of saved searches.
+
+Schedules:
+    manual: every `interval_value` `interval_unit` ('minutes' or 'hours') after the last run
+    daily:  at `schedule_time`
+    weekly: at `schedule_time` on `schedule_days` (comma-separated 'Mon,Tue,...')
+A search with a `duration` (minutes) stops being scheduled once that much time has
+passed since it was created. A run that fails or times out is retried
+SCHEDULE_FAILURE_BACKOFF minutes later instead of on the next tick.
+"""
+import os
+from datetime import datetime, timedelta
+from sqlalchemy.exc import SQLAlchemyError
+from . import scheduler, db
+from .models import SavedSearch
+from .scrapper import run_scraper_batch, BatchSearch
+from .job_queue import search_executor, check_deadline, QueueFull
+from .metrics import count, run_record, timed
+
+SCHEDULE_FAILURE_BACKOFF = int(os.getenv("SCHEDULE_FAILURE_BACKOFF", 15))  # minutes
+
+
+def _schedule_time(search):
+    if isinstance(search.schedule_time, str):
+        return datetime.strptime(search.schedule_time, '%H:%M').time()
+    return search.schedule_time
+
+
+def _next_interval_run(search, after):
+    if not search.interval_value:
+        return None
+    if search.interval_unit == 'hours':
+        interval = timedelta(hours=int(search.interval_value))
+    else:
+        interval = timedelta(minutes=int(search.interval_value))
+    if search.last_run is None:
+        return after
+    return max(search.last_run + interval, after)
+
+
+def _next_daily_run(search, after, days=None):
+    scheduled_time = _schedule_time(search)
+    if scheduled_time is None:
+        return None
+    for offset in range(8):
+        candidate = datetime.combine(after.date() + timedelta(days=offset), scheduled_time)
+        if candidate <= after:
+            continue
+        if days is None or candidate.strftime('%a') in days:
+            return candidate
+    return None
+
+
+def compute_next_run(search, after):
+    """Return when the search is next due at or after `after`, or None if it is not scheduled."""
+    if search.schedule_type == 'manual':
+        next_run = _next_interval_run(search, after)
+    elif search.schedule_type == 'daily':
+        next_run = _next_daily_run(search, after)
+    elif search.schedule_type == 'weekly':
+        days = {day.strip() for day in (search.schedule_days or '').split(',') if day.strip()}
+        next_run = _next_daily_run(search, after, days)
+    else:
+        return None
+
+    if next_run and search.duration and search.date_created:
+        if next_run >= search.date_created + timedelta(minutes=search.duration):
+            return None
+    return next_run
+
+
+def reschedule(search, after=None):
+    """Recompute `next_run_at`; call after creating or editing a saved search's schedule."""
+    after = after or datetime.now()
+    search.next_run_at = compute_next_run(search, after)
+    if search.next_run_at is None and search.duration:
+        search.schedule_type = None  # duration exhausted; deactivate schedule
+
+
+def backfill_next_runs():
+    """Give scheduled searches stored before `next_run_at` existed their first run time."""
+    now = datetime.now()
+    pending = SavedSearch.query.filter(
+        SavedSearch.schedule_type.isnot(None),
+        SavedSearch.next_run_at.is_(None)
+    ).all()
+    for search in pending:
+        reschedule(search, now)
+    if pending:
+        db.session.commit()
+
+
+@scheduler.task('interval', id='check_scheduled_searches', minutes=1)
+def check_scheduled_searches():
+    """Enqueue due searches on the search workers; the tick itself never scrapes."""
+    with run_record('scheduler_tick'):
+        with timed('tick_query'), scheduler.app.app_context():
+            current_time = datetime.now()
+            due = db.session.query(
+                SavedSearch.id, SavedSearch.city, SavedSearch.country
+            ).filter(
+                SavedSearch.next_run_at <= current_time
+            ).order_by(SavedSearch.next_run_at).all()
+        count('due_searches_total', len(due))
+
+        with timed('tick_enqueue'):
+            for search_id, city, country in due:
+                try:
+                    # Items are search ids, so a search already queued or running is not queued twice
+                    search_executor.submit(('saved_search', city, country), run_saved_searches, search_id)
+                except QueueFull:
+                    count('queue_full_total')
+                    print("Search queue full; remaining due searches wait for the next tick")
+                    break
+
+
+def run_saved_searches(search_ids):
+    searches = SavedSearch.query.filter(SavedSearch.id.in_(search_ids)).all()
+    run_scheduled_searches(searches)
+
+
+def run_scheduled_searches(searches):
+    # Group by location so each city is geocoded and scraped in one browser session
+    by_location = {}
+    for search in searches:
+        by_location.setdefault((search.city, search.country), []).append(search)
+
+    for (city, country), group in by_location.items():
+        try:
+            check_deadline()
+            run_scraper_batch(city, country, [
+                BatchSearch(
+                    product=search.product,
+                    target_price=search.target_price,
+                    user_id=search.user_id,
+                    should_send_email=search.email_notification
+                )
+                for search in group
+            ])
+        except Exception:
+            _back_off(group)
+            raise
+        finished_at = datetime.now()
+        for search in group:
+            search.last_run = finished_at
+            reschedule(search, finished_at)
+        db.session.commit()
+
+
+def _back_off(searches):
+    # Without this a failing search stays due and is re-enqueued on every tick
+    db.session.rollback()
+    retry_at = datetime.now() + timedelta(minutes=SCHEDULE_FAILURE_BACKOFF)
+    try:
+        for search in searches:
+            search.next_run_at = retry_at
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Could not back off failed saved searches: {e}")
+
+
+def run_scheduled_search(search):
+    run_scheduled_searches([search])
@@ -7,17 +7,77 @@ function deleteNote(noteId) {
   });
 }
 
+let dealsEtag = null;
+let dealStream = null;
+
 function updateDealsList() {
-    fetch('/get-deals')
-        .then(response => response.json())
-        .then(deals => {
-            const dealsContainer = document.querySelector('.row-cols-1');
-            // Update deals display
-            renderDeals(deals);
+    const dealsBody = document.getElementById('previousDealsBody');
+    if (!dealsBody) {
+        return;
+    }
+    // Deals arrive over the event stream while it is connected; poll only as a fallback
+    if (dealStream && dealStream.readyState === EventSource.OPEN) {
+        return;
+    }
+    const headers = dealsEtag ? { 'If-None-Match': dealsEtag } : {};
+    fetch(`/get-deals?since=${encodeURIComponent(dealsBody.dataset.latestId || 0)}`, { headers: headers, cache: 'no-store' })
+        .then(response => {
+            if (response.status === 304 || !response.ok) {
+                return null;
+            }
+            dealsEtag = response.headers.get('ETag');
+            return response.json();
+        })
+        .then(page => {
+            if (!page) {
+                return;
+            }
+            dealsBody.dataset.latestId = page.cursor;
+            renderDeals(page.deals);
         });
 }
 
+// Prepend deals (oldest first) so the newest ends up at the top of the list
+function renderDeals(deals) {
+    const dealsBody = document.getElementById('previousDealsBody');
+    if (!dealsBody || !deals.length) {
+        return;
+    }
+    let dealsContainer = document.getElementById('previousDeals');
+    if (!dealsContainer) {
+        const emptyNotice = document.getElementById('noPreviousDeals');
+        if (emptyNotice) {
+            emptyNotice.remove();
+        }
+        dealsContainer = document.createElement('div');
+        dealsContainer.className = 'row';
+        dealsContainer.id = 'previousDeals';
+        dealsBody.appendChild(dealsContainer);
+    }
+    deals.forEach(deal => {
+        if (!dealsContainer.querySelector(`[data-deal-id="${deal.id}"]`)) {
+            dealsContainer.prepend(buildDealCard(deal));
+        }
+    });
+}
+
+function connectDealStream() {
+    const dealsBody = document.getElementById('previousDealsBody');
+    if (!dealsBody || !window.EventSource) {
+        return;
+    }
+    dealStream = new EventSource('/deals/stream');
+    dealStream.addEventListener('deal', event => {
+        const deal = JSON.parse(event.data);
+        if (deal.id > Number(dealsBody.dataset.latestId || 0)) {
+            dealsBody.dataset.latestId = deal.id;
+        }
+        renderDeals([deal]);
+    });
+}
+
 setInterval(updateDealsList, 300000); // Update every 5 minutes
+document.addEventListener('DOMContentLoaded', connectDealStream);
 
 document.addEventListener('DOMContentLoaded', function() {
     const scheduleTypes = document.getElementsByName('scheduleType');
@@ -36,3 +96,161 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 });
+
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML;
+}
+
+function formatPrice(value) {
+    return (value || 0).toFixed(2);
+}
+
+function buildDealCard(deal) {
+    const col = document.createElement('div');
+    col.className = 'col-md-3 mb-3';
+    col.dataset.dealId = deal.id;
+    const created = deal.date_created && window.moment ? moment.utc(deal.date_created).fromNow() : (deal.date_created || '');
+    col.innerHTML = `
+        <div class="card h-100 shadow-sm hover-effect border-0">
+            <div class="card-header bg-light d-flex justify-content-between align-items-center py-2">
+                <div class="text-muted small">
+                    <i class="fas fa-store me-1"></i>
+                    ${escapeHtml(deal.store || 'Unknown Store')}
+                </div>
+                <form action="/delete-deal" method="POST" class="d-inline">
+                    <input type="hidden" name="deal_id" value="${deal.id}">
+                    <button type="submit" class="btn btn-link btn-sm text-muted p-0">
+                        <i class="fas fa-trash"></i>
+                    </button>
+                </form>
+            </div>
+            <div class="card-body p-3">
+                <h6 class="card-title text-truncate mb-3">${escapeHtml(deal.product || 'Unknown Product')}</h6>
+                <div class="small">
+                    <p class="mb-1">Current: €${formatPrice(deal.price)}</p>
+                    <p class="mb-2">Target: €${formatPrice(deal.target_price)}</p>
+                    <span class="text-muted smaller">
+                        <i class="far fa-clock me-1"></i>
+                        ${escapeHtml(created)}
+                    </span>
+                </div>
+            </div>
+        </div>`;
+    return col;
+}
+
+// Keyset-paginated "previous deals": fetch the next page when the sentinel scrolls into view
+document.addEventListener('DOMContentLoaded', function() {
+    const dealsContainer = document.getElementById('previousDeals');
+    const sentinel = document.getElementById('dealsSentinel');
+    const loadMoreButton = document.getElementById('loadMoreDeals');
+    if (!dealsContainer || !sentinel) {
+        return;
+    }
+
+    let loading = false;
+    let observer = null;
+
+    function loadMoreDeals() {
+        const cursor = dealsContainer.dataset.nextCursor;
+        if (loading || !cursor) {
+            return;
+        }
+        loading = true;
+        fetch(`/deals?before=${encodeURIComponent(cursor)}`)
+            .then(response => response.json())
+            .then(page => {
+                page.deals.forEach(deal => dealsContainer.appendChild(buildDealCard(deal)));
+                dealsContainer.dataset.nextCursor = page.next_cursor || '';
+                if (!page.next_cursor) {
+                    sentinel.remove();
+                    if (observer) {
+                        observer.disconnect();
+                    }
+                }
+            })
+            .finally(() => {
+                loading = false;
+            });
+    }
+
+    loadMoreButton.addEventListener('click', loadMoreDeals);
+    if ('IntersectionObserver' in window) {
+        observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadMoreDeals();
+            }
+        }, { rootMargin: '200px' });
+        observer.observe(sentinel);
+    }
+});
+
+function buildResultCard(result) {
+    const col = document.createElement('div');
+    col.className = 'col-md-3 mb-3';
+    const found = result.timestamp && window.moment ? moment(result.timestamp).fromNow() : (result.timestamp || '');
+    col.innerHTML = `
+        <div class="card h-100 shadow-sm hover-effect border-0">
+            <div class="card-header bg-light d-flex justify-content-between align-items-center py-2">
+                <div class="text-success small">
+                    <i class="fas fa-store me-1"></i>
+                    ${escapeHtml(result.store)}
+                </div>
+            </div>
+            <div class="card-body p-3">
+                <h6 class="card-title text-truncate mb-3">${escapeHtml(result.product_name)}</h6>
+                <div class="small">
+                    <p class="mb-1">Current: €${formatPrice(result.price)}</p>
+                    <p class="mb-2">Target: €${formatPrice(result.target_price)}</p>
+                    <span class="text-muted smaller">
+                        <i class="far fa-clock me-1"></i>
+                        ${escapeHtml(found)}
+                    </span>
+                </div>
+            </div>
+        </div>`;
+    return col;
+}
+
+function renderSearchResults(container, results) {
+    const wrapper = document.createElement('div');
+    wrapper.className = 'results-container';
+    const row = document.createElement('div');
+    row.className = 'row';
+    results.forEach(result => row.appendChild(buildResultCard(result)));
+    wrapper.appendChild(row);
+    container.appendChild(wrapper);
+}
+
+// The home form's search runs as a background job; poll its status until it finishes
+function pollSearchJob(container, jobId, delay) {
+    const status = document.getElementById('searchJobStatus');
+    fetch(`/jobs/${encodeURIComponent(jobId)}`)
+        .then(response => response.json())
+        .then(job => {
+            if (job.status === 'queued' || job.status === 'running') {
+                setTimeout(() => pollSearchJob(container, jobId, Math.min(delay * 1.5, 5000)), delay);
+                return;
+            }
+            if (status) {
+                status.remove();
+            }
+            if (job.status === 'done' && job.result && job.result.length) {
+                renderSearchResults(container, job.result);
+            } else if (job.status === 'done') {
+                container.insertAdjacentHTML('beforeend', '<div class="text-center">No deals found</div>');
+            } else {
+                container.insertAdjacentHTML('beforeend',
+                    `<div class="alert alert-danger">${escapeHtml(job.error || 'Search failed')}</div>`);
+            }
+        });
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('searchResults');
+    if (container && container.dataset.searchJob) {
+        pollSearchJob(container, container.dataset.searchJob, 500);
+    }
+});
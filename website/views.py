@@ -4,50 +4,55 @@ from .models import Note, ScraperResult, SavedSearch, ScraperSchedule
 from . import db
 from .scrapper import run_scraper
 from geopy.exc import GeocoderTimedOut
-from geopy.geocoders import Nominatim
+from .geocoding import geocode
 import time
 import datetime
+import queue
 import json
+import os
+import hmac
 from flask import redirect, url_for
-from io import StringIO
-import csv
-from flask import make_response
+from flask import make_response, Response, stream_with_context
 from flask import json
 from . import scheduler
 from .models import User
-# At the top of views.py, add:
-# At the top of views.py, update the import to:
 from .api_searcher import search_products
-
-# Get the values from the current user and form data
-city = current_user.city
-country = current_user.country
-product = request.form.get('product')
-price = request.form.get('price').replace(',', '.')
-email_notification = request.form.get('emailNotification') == 'on'
-# Then in your code, use it directly:
-results = search_products(
-    city=city,
-    country=country,
-    product=product,
-    target_price=float(price),
-    should_send_email=email_notification,
-    user_id=current_user.id
-)
-
+from .deals import serialize_deal
+from .events import deal_events
+from .price_history import price_history
+from .deal_export import EXPORT_FORMATS, deals_export_query, export_chunks
+from .metrics import render_prometheus
+from .job_queue import search_executor, web_search_executor, check_deadline, QueueFull
 
 
 views = Blueprint('views', __name__)
 # Global schedule time settings
 SCHEDULE_HOUR = 7  # Default 7 AM
 SCHEDULE_MINUTE = 0  # Default 0 minutes
+DEALS_PAGE_SIZE = 24
+DEALS_PAGE_SIZE_MAX = 100
+DEAL_STREAM_HEARTBEAT = 25  # seconds between keep-alive comments on /deals/stream
+PRICE_HISTORY_DAYS = 30
+PRICE_HISTORY_DAYS_MAX = 365
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # when set, /metrics requires 'Authorization: Bearer <token>'
+
+def deals_page(user_id, before_id=None, limit=DEALS_PAGE_SIZE):
+    """Return (deals, next_cursor) for the user's deals, newest first, with id < before_id.
+
+    Keyset pagination on the primary key, so every page costs the same regardless of history size.
+    """
+    query = ScraperResult.query.filter_by(user_id=user_id)
+    if before_id is not None:
+        query = query.filter(ScraperResult.id < before_id)
+    deals = query.order_by(ScraperResult.id.desc()).limit(limit + 1).all()
+    next_cursor = deals[limit - 1].id if len(deals) > limit else None
+    return deals[:limit], next_cursor
+
 
 def geocode_with_retry(location_string, max_attempts=5, initial_delay=1):
-    geolocator = Nominatim(user_agent="FindmyPrize_Flask", timeout=10)
-    
     for attempt in range(max_attempts):
         try:
-            location = geolocator.geocode(location_string)
+            location = geocode(location_string)
             if location:
                 return location
         except GeocoderTimedOut:
@@ -64,7 +69,7 @@ def home():
     city = current_user.city
     country = current_user.country
     saved_searches = SavedSearch.query.filter_by(user_id=current_user.id).order_by(SavedSearch.date_created.desc()).first()
-    saved_deals = ScraperResult.query.filter_by(user_id=current_user.id).order_by(ScraperResult.id.desc()).all()
+    saved_deals, next_cursor = deals_page(current_user.id)
 
     if request.method == 'POST':
         product = request.form.get('product')
@@ -86,46 +91,119 @@ def home():
                 db.session.add(saved_search)
                 db.session.commit()
 
-            # Use the new API search instead of scraper
-            from .api_searcher import search_products
-            results = search_products(
-                city=city,
-                country=country,
-                product=product,
-                target_price=float(price),
-                should_send_email=email_notification,
-                user_id=current_user.id
-            )
-
-            if results:
-                for result in results:
-                    scraper_result = ScraperResult(
-                        store=result['store'],
-                        price=result['price'],
-                        product=result['product_name'],
-                        target_price=float(price),
-                        city=city,
-                        country=country,
-                        email_notification=email_notification,
-                        user_id=current_user.id,
-                        data=json.dumps(result)
-                    )
-                    db.session.add(scraper_result)
-                db.session.commit()
+            # Run the search on a background worker; the page picks up the result via /jobs/<id>
+            params = (current_user.id, product, float(price), city, country, email_notification)
+            try:
+                job = web_search_executor.submit(('web_search',) + params, run_web_search, params,
+                                                 owner=current_user.id)
+            except QueueFull:
+                if _wants_json():
+                    return jsonify({'error': 'Too many searches in progress, try again shortly'}), 503
+                flash('Too many searches in progress, please try again shortly.', category='error')
+                return redirect(url_for('views.home'))
+
+            if _wants_json():
+                return jsonify({
+                    'job_id': job.id,
+                    'status_url': url_for('views.job_status', job_id=job.id)
+                }), 202
 
             return render_template('home.html',
                                 user=current_user,
-                                results=results,
+                                search_job_id=job.id,
                                 saved_searches=saved_searches,
                                 deals=saved_deals,
+                                next_cursor=next_cursor,
                                 is_previous_deal=True)
 
     return render_template('home.html',
                          user=current_user,
                          deals=saved_deals,
+                         next_cursor=next_cursor,
                          saved_search=saved_searches,
                          is_previous_deal=True)
 
+@views.route('/deals')
+@login_required
+def list_deals():
+    before_id = request.args.get('before', type=int)
+    limit = min(request.args.get('limit', DEALS_PAGE_SIZE, type=int), DEALS_PAGE_SIZE_MAX)
+    deals, next_cursor = deals_page(current_user.id, before_id=before_id, limit=max(limit, 1))
+    return jsonify({
+        'deals': [serialize_deal(deal) for deal in deals],
+        'next_cursor': next_cursor
+    })
+
+@views.route('/get-deals')
+@login_required
+def get_deals():
+    """New deals since the client's cursor (last seen deal id), oldest first.
+
+    The ETag only depends on the cursor and the user's newest deal id, so an idle poll
+    is answered with 304 after a single index lookup.
+    """
+    since = request.args.get('since', 0, type=int)
+    latest_id = db.session.query(db.func.max(ScraperResult.id)).filter_by(user_id=current_user.id).scalar() or 0
+    etag = f"deals-{current_user.id}-{since}-{latest_id}"
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    deals = []
+    if latest_id > since:
+        deals = ScraperResult.query.filter(
+            ScraperResult.user_id == current_user.id,
+            ScraperResult.id > since
+        ).order_by(ScraperResult.id.asc()).limit(DEALS_PAGE_SIZE_MAX).all()
+
+    response = jsonify({
+        'deals': [serialize_deal(deal) for deal in deals],
+        'cursor': deals[-1].id if deals else max(since, latest_id)
+    })
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@views.route('/deals/stream')
+@login_required
+def stream_deals():
+    """Server-sent events: push each deal stored for the current user as it is inserted."""
+    user_id = current_user.id
+    subscriber = deal_events.subscribe(user_id)
+
+    # Replay what was missed while the browser was reconnecting
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    missed = []
+    if last_event_id is not None:
+        missed = [serialize_deal(deal) for deal in ScraperResult.query.filter(
+            ScraperResult.user_id == user_id,
+            ScraperResult.id > last_event_id
+        ).order_by(ScraperResult.id.asc()).limit(DEALS_PAGE_SIZE_MAX).all()]
+
+    def format_event(deal):
+        return f"id: {deal['id']}\nevent: deal\ndata: {json.dumps(deal)}\n\n"
+
+    def generate():
+        try:
+            yield "retry: 10000\n\n"
+            for deal in missed:
+                yield format_event(deal)
+            while True:
+                try:
+                    deal = subscriber.get(timeout=DEAL_STREAM_HEARTBEAT)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_event(deal)
+        finally:
+            deal_events.unsubscribe(user_id, subscriber)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @views.route('/delete-note', methods=['POST'])
 def delete_note():  
      note = json.loads(request.data) # this function expects a JSON from the INDEX.js file 
@@ -151,32 +229,73 @@ def handle_geocoding():
     if location:
         city = location.address.split(',')[0]  # Extract city from geocoded address
         country = location.address.split(',')[-1]  # Extract country from geocoded address
-        
-        scraper_results = run_scraper(
-            city=city,
-            country=country,
-            product=product,
-            target_price=float(target_price),
-            should_send_email=email_notification
-        )
-        
+
+        params = (current_user.id, product, float(target_price), city, country, email_notification)
+        try:
+            job = web_search_executor.submit(('scrape',) + params, run_address_scrape, params,
+                                             owner=current_user.id)
+        except QueueFull:
+            return jsonify({'error': 'Too many searches in progress, try again shortly'}), 503
+
         scraper_result = ScraperResult(
             data=f"Geocoded: {address} to {location.latitude}, {location.longitude}",
             user_id=current_user.id
         )
         db.session.add(scraper_result)
         db.session.commit()
-        
+
         return jsonify({
             'latitude': location.latitude,
             'longitude': location.longitude,
             'address': location.address,
-            'scraper_results': scraper_results
-        })
+            'job_id': job.id,
+            'status_url': url_for('views.job_status', job_id=job.id)
+        }), 202
     else:
         return jsonify({'error': 'Geocoding failed'}), 500
 # Add other existing view functions here     return jsonify({})
 
+@views.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    job = web_search_executor.get_job(job_id)
+    if job is None or job.owner != current_user.id:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+def _wants_json():
+    return request.accept_mimetypes.best == 'application/json'
+
+def _json_safe_results(results):
+    return [dict(result, timestamp=result['timestamp'].isoformat()) for result in results]
+
+def run_web_search(items):
+    # WEB_SEARCH_JOB_TIMEOUT is enforced inside search_products/run_scraper via check_deadline
+    check_deadline()
+    user_id, product, target_price, city, country, email_notification = items[0]
+    # search_products stores the deals itself; the result is only for display
+    results = search_products(
+        city=city,
+        country=country,
+        product=product,
+        target_price=target_price,
+        should_send_email=email_notification,
+        user_id=user_id
+    )
+    return _json_safe_results(results)
+
+def run_address_scrape(items):
+    check_deadline()
+    user_id, product, target_price, city, country, email_notification = items[0]
+    return _json_safe_results(run_scraper(
+        city=city,
+        country=country,
+        product=product,
+        target_price=target_price,
+        should_send_email=email_notification,
+        user_id=user_id
+    ))
+
 @views.route('/past-results')
 def past_results():
     results = ScraperResult.query.order_by(ScraperResult.price.asc()).all()
@@ -210,19 +329,57 @@ def delete_deal():
     
     return redirect(url_for('views.home'))
 
+@views.route('/price-history')
+@login_required
+def get_price_history():
+    """Daily min/avg/max price per store for a product, from the precomputed rollups."""
+    product = request.args.get('product', '').strip()
+    if not product:
+        return jsonify({'error': 'product is required'}), 400
+    days = min(max(request.args.get('days', PRICE_HISTORY_DAYS, type=int), 1), PRICE_HISTORY_DAYS_MAX)
+    return jsonify(price_history(product, days))
+
+@views.route('/metrics')
+def metrics():
+    """Stage timings, counters and cache/pool/queue stats in the Prometheus text format."""
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @views.route('/export-deals')
+@login_required
 def export_deals():
-    deals = ScraperResult.query.all()
-    si = StringIO()
-    cw = csv.writer(si)
-    cw.writerow(['ID', 'Date', 'Data'])  # Headers
-    for deal in deals:
-        cw.writerow([deal.id, deal.date_created, deal.data])
-    
-    output = make_response(si.getvalue())
-    output.headers["Content-Disposition"] = "attachment; filename=deals_export.csv"
-    output.headers["Content-type"] = "text/csv"
-    return output
+    """Stream the current user's deals as CSV or JSONL.
+
+    Query args: format=csv|jsonl, from/to=YYYY-MM-DD (inclusive), product, store, gzip=1.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        since, until = (
+            datetime.date.fromisoformat(request.args[arg]) if request.args.get(arg) else None
+            for arg in ('from', 'to')
+        )
+    except ValueError:
+        return jsonify({'error': 'from/to must be dates (YYYY-MM-DD)'}), 400
+    compress = request.args.get('gzip') in ('1', 'true', 'yes')
+
+    query = deals_export_query(
+        current_user.id,
+        since=since,
+        until=until,
+        product=request.args.get('product') or None,
+        store=request.args.get('store') or None
+    )
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"deals_export.{extension}" + ('.gz' if compress else '')
+    headers = {'Content-Disposition': f"attachment; filename={filename}"}
+    if compress:
+        mimetype = 'application/gzip'
+    return Response(stream_with_context(export_chunks(query, fmt, compress)), mimetype=mimetype, headers=headers)
 
 
 
@@ -288,43 +445,46 @@ def cancel_schedule(schedule_id):
                  return redirect(url_for('views.scheduler_status'))
 
 def scheduled_job(schedule_id, app):
+    """Cron entry point: hand the schedule to the search workers instead of running it here."""
     with app.app_context():
         schedule = ScraperSchedule.query.get(schedule_id)
-        current_time = datetime.datetime.now()
-        schedule_time = datetime.time(SCHEDULE_HOUR, SCHEDULE_MINUTE)
-        next_run = datetime.datetime.combine(current_time.date(), schedule_time)
-        
-        if current_time > next_run:
-            next_run = next_run + datetime.timedelta(days=1)
-        schedule.next_run = next_run
-
-        from .api_searcher import search_products
-        results = search_products(
-            city=schedule.city,
-            country=schedule.country,
-            product=schedule.product,
-            target_price=schedule.target_price,
-            should_send_email=True,
-            user_id=schedule.user_id
-        )
+        if schedule is None or not schedule.active:
+            return
+        key = ('schedule', schedule.product, schedule.city, schedule.country)
+    try:
+        search_executor.submit(key, run_schedules, schedule_id)
+    except QueueFull:
+        print(f"Search queue full; skipping run of schedule {schedule_id}")
+
+def run_schedules(schedule_ids):
+    for schedule_id in schedule_ids:
+        check_deadline()
+        run_schedule(schedule_id)
+
+def run_schedule(schedule_id):
+    schedule = ScraperSchedule.query.get(schedule_id)
+    if schedule is None:
+        return
+    current_time = datetime.datetime.now()
+    schedule_time = datetime.time(SCHEDULE_HOUR, SCHEDULE_MINUTE)
+    next_run = datetime.datetime.combine(current_time.date(), schedule_time)
 
-        schedule.last_run = current_time
-
-        if results:
-            for result in results:
-                scraper_result = ScraperResult(
-                    data=json.dumps(result),
-                    user_id=schedule.user_id,
-                    product=schedule.product,
-                    target_price=schedule.target_price,
-                    city=schedule.city,
-                    country=schedule.country,
-                    email_notification=True,
-                    store=result.get('store'),
-                    price=float(result.get('price', 0))
-                )
-                db.session.add(scraper_result)
-            db.session.commit()
+    if current_time > next_run:
+        next_run = next_run + datetime.timedelta(days=1)
+    schedule.next_run = next_run
+
+    # search_products stores the deals itself
+    search_products(
+        city=schedule.city,
+        country=schedule.country,
+        product=schedule.product,
+        target_price=schedule.target_price,
+        should_send_email=True,
+        user_id=schedule.user_id
+    )
+
+    schedule.last_run = current_time
+    db.session.commit()
 
 @views.route('/create-schedule', methods=['POST'])
 @login_required